@@ -0,0 +1 @@
+"""Benchmarks for SONVER hot paths."""
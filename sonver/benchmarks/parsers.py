@@ -0,0 +1,109 @@
+"""Micro-benchmark for ``RRRScraper.parse_parts_page``.
+
+Compares the current parser against the original ``html.parser`` +
+``select_one`` implementation on saved result pages and checks that both
+produce identical items::
+
+    python -m sonver.benchmarks.parsers saved_pages/*.html
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from bs4 import BeautifulSoup
+
+from ..scrapers.rrr import RRRScraper
+from .synthetic import results_page_html
+
+ParseFn = Callable[[str], Sequence[Any]]
+
+
+def legacy_parse_parts_page(scraper: RRRScraper, html: str) -> List[Dict[str, Any]]:
+    """The original pure-Python parser, kept as the reference for comparisons."""
+
+    soup = BeautifulSoup(html, "html.parser")
+    parts: List[Dict[str, Any]] = []
+    for item in soup.select("div.part, div.search-item, li.search-item"):
+        article = item.get("data-article") or item.get("data-code") or ""
+        title_el = item.select_one(".title, .search-item__title, h3")
+        description = title_el.get_text(strip=True) if title_el else ""
+        price_el = item.select_one(".price, .search-item__price, .item-price")
+        price_text = price_el.get_text(strip=True) if price_el else ""
+        price, currency = scraper._parse_price(price_text)
+        url_el = item.select_one("a")
+        url = scraper.base_url + url_el.get("href", "") if url_el else ""
+        image_el = item.select_one("img")
+        image_url = image_el.get("src") if image_el else ""
+        location_el = item.select_one(".location, .search-item__location")
+        location = location_el.get_text(strip=True) if location_el else ""
+        parts.append(
+            {
+                "platform": scraper.platform,
+                "article": article,
+                "brand": "",
+                "model": "",
+                "generation": "",
+                "category": "",
+                "description": description,
+                "price": price,
+                "currency": currency,
+                "location": location,
+                "url": url,
+                "image_url": image_url,
+            }
+        )
+    return parts
+
+
+def _time(fn: ParseFn, pages: Sequence[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for page in pages:
+            fn(page)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(pages: Sequence[str], repeat: int = 3, parser: Optional[str] = None) -> Dict[str, Any]:
+    scraper = RRRScraper() if parser is None else RRRScraper(parser=parser)
+    current: ParseFn = lambda html: scraper.parse_parts_page(html, "", "", "", "")
+    legacy: ParseFn = lambda html: legacy_parse_parts_page(scraper, html)
+    identical = all(
+        [item.to_dict() for item in current(page)] == [{**item, "article_key": "", "last_seen": ""} for item in legacy(page)]
+        for page in pages
+    )
+    legacy_s = _time(legacy, pages, repeat)
+    current_s = _time(current, pages, repeat)
+    return {
+        "benchmark": "rrr.parse_parts_page",
+        "parser": scraper.parser,
+        "pages": len(pages),
+        "items": sum(len(current(page)) for page in pages),
+        "identical": identical,
+        "legacy_s": round(legacy_s, 6),
+        "current_s": round(current_s, 6),
+        "speedup": round(legacy_s / current_s, 2) if current_s else None,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pages", nargs="*", type=Path, help="saved result pages; synthetic pages if omitted")
+    parser.add_argument("--synthetic", type=int, default=20, help="number of synthetic pages to generate")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--parser", help="BeautifulSoup backend to benchmark (default: scraper default)")
+    args = parser.parse_args(argv)
+
+    if args.pages:
+        pages = [path.read_text(encoding="utf-8") for path in args.pages]
+    else:
+        pages = [results_page_html(seed=i) for i in range(args.synthetic)]
+    print(json.dumps(run(pages, repeat=args.repeat, parser=args.parser), indent=2))
+
+
+if __name__ == "__main__":
+    main()
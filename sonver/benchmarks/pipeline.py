@@ -0,0 +1,133 @@
+"""Micro-benchmark for the parse -> normalize -> upsert-parameters pipeline.
+
+Compares :class:`~sonver.record.PartRecord` batches against the original
+per-item dicts (a dict from the parser, a normalized copy, then a tuple
+built with ``item.get``) on synthetic ``/api/search`` items. Reports time
+per item and the ``tracemalloc`` peak while one batch is held::
+
+    python -m sonver.benchmarks.pipeline --items 1000000
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+from datetime import datetime
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from ..db import PART_COLUMNS, part_params
+from ..normalize import normalize_article, normalize_batch
+from ..scrapers.rrr import RRRScraper
+from .synthetic import search_json_items
+
+LEAF = ("VW", "Golf", "V", "Headlights")
+Pipeline = Callable[[Sequence[Dict[str, Any]]], List[Tuple[Any, ...]]]
+
+
+def legacy_parse_json_item(
+    item: Dict[str, Any], brand: str, model: str, generation: str, category: str
+) -> Dict[str, Any]:
+    return {
+        "platform": "RRR",
+        "article": item.get("article") or item.get("code") or item.get("partNumber") or "",
+        "brand": brand,
+        "model": model,
+        "generation": generation,
+        "category": category,
+        "description": item.get("title") or item.get("description") or "",
+        "price": float(item.get("price") or 0),
+        "currency": item.get("currency") or item.get("currencyCode") or "EUR",
+        "location": item.get("location") or item.get("city") or "",
+        "url": item.get("url") or item.get("link") or "",
+        "image_url": item.get("image") or item.get("imageUrl") or "",
+    }
+
+
+def legacy_normalize_item(raw_item: Dict[str, Any]) -> Dict[str, Any]:
+    article = str(raw_item.get("article", "")).strip()
+    return {
+        "platform": raw_item.get("platform", "unknown"),
+        "article": article,
+        "article_key": normalize_article(article),
+        "brand": (raw_item.get("brand") or "").strip(),
+        "model": (raw_item.get("model") or "").strip(),
+        "generation": (raw_item.get("generation") or "").strip(),
+        "category": (raw_item.get("category") or "").strip(),
+        "description": (raw_item.get("description") or "").strip(),
+        "price": float(raw_item.get("price") or 0.0),
+        "currency": raw_item.get("currency", "EUR"),
+        "location": (raw_item.get("location") or "").strip(),
+        "url": raw_item.get("url", ""),
+        "image_url": raw_item.get("image_url", ""),
+        "last_seen": datetime.utcnow().isoformat(),
+    }
+
+
+def legacy_pipeline(page: Sequence[Dict[str, Any]]) -> List[Tuple[Any, ...]]:
+    items = [legacy_normalize_item(legacy_parse_json_item(item, *LEAF)) for item in page]
+    return [tuple(item.get(column) for column in PART_COLUMNS) for item in items]
+
+
+def record_pipeline(scraper: RRRScraper, page: Sequence[Dict[str, Any]]) -> List[Tuple[Any, ...]]:
+    records = normalize_batch([scraper.parse_json_item(item, *LEAF) for item in page])
+    return [part_params(record) for record in records]
+
+
+def _measure(pipeline: Pipeline, pages: Sequence[Sequence[Dict[str, Any]]], items: int) -> Dict[str, Any]:
+    start = time.perf_counter()
+    done = 0
+    while done < items:
+        for page in pages:
+            pipeline(page)
+            done += len(page)
+            if done >= items:
+                break
+    elapsed = time.perf_counter() - start
+
+    # Peak while the parsed items and rows of one batch are alive.
+    batch = [item for page in pages for item in page]
+    tracemalloc.start()
+    rows = pipeline(batch)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    return {
+        "items": done,
+        "total_s": round(elapsed, 3),
+        "us_per_item": round(elapsed / done * 1e6, 3),
+        "batch": len(batch),
+        "batch_peak_kib": round(peak / 1024, 1),
+    }
+
+
+def run(items: int = 100_000, batch_size: int = 1000, seed: int = 0) -> Dict[str, Any]:
+    pages = [search_json_items(50, seed + i) for i in range(max(1, batch_size // 50))]
+    current: Pipeline = partial(record_pipeline, RRRScraper())
+    # Rows match up to the last_seen timestamp.
+    identical = all(
+        [row[:-1] for row in legacy_pipeline(page)] == [row[:-1] for row in current(page)] for page in pages
+    )
+    legacy = _measure(legacy_pipeline, pages, items)
+    records = _measure(current, pages, items)
+    return {
+        "benchmark": "parse_normalize_params",
+        "identical": identical,
+        "legacy_dicts": legacy,
+        "part_records": records,
+        "speedup": round(legacy["total_s"] / records["total_s"], 2) if records["total_s"] else None,
+        "peak_ratio": round(records["batch_peak_kib"] / legacy["batch_peak_kib"], 2),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100_000, help="items pushed through each pipeline")
+    parser.add_argument("--batch-size", type=int, default=1000, help="items held for the memory peak")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    print(json.dumps(run(args.items, args.batch_size, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""Benchmark suite for SONVER hot paths on a synthetic catalog.
+
+Builds (or reuses) a synthetic ``sonver.db`` and times the search/tree
+queries, the RRR parsers and the parse/normalize pipeline against it. The
+catalog is bulk-loaded with plain inserts, and derived tables and the text
+index are built once afterwards, so even 1e7 rows are quick to set up; the
+load time is reported under ``setup``. Ingest through
+:class:`~sonver.db.PartWriter` and ``upsert_part`` is timed separately on
+its own database of ``--ingest-rows`` rows. Results are written as JSON so
+runs can be diffed between commits::
+
+    python -m sonver.benchmarks --rows 100000 --db /tmp/bench.db --out bench.json
+"""
+
+import argparse
+import json
+import platform
+import sqlite3
+import subprocess
+import sys
+import time
+from itertools import islice
+from pathlib import Path
+from statistics import mean
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .. import db, search_api
+from ..catalog import rebuild_catalog_tree
+from ..meta import DATA_GENERATION, bump_meta
+from ..normalize import normalize_item
+from ..price_stats import rebuild_price_stats
+from ..scrapers.rrr import RRRScraper
+from . import pipeline
+from .synthetic import generate_items, results_page_html, sample_articles, sample_leaves, search_json_items
+
+Result = Dict[str, Any]
+
+LOAD_CHUNK = 50_000
+_INSERT_SQL = f"INSERT INTO parts ({', '.join(db.PART_COLUMNS)}) VALUES ({', '.join('?' * len(db.PART_COLUMNS))})"
+_FTS_TRIGGERS = ("parts_fts_insert", "parts_fts_delete", "parts_fts_update")
+
+
+def _percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def latency(fn: Callable[..., Any], calls: Iterable[Tuple[Any, ...]]) -> Result:
+    """Call ``fn(*args)`` for each args tuple and summarize per-call latency."""
+
+    samples: List[float] = []
+    for args in calls:
+        start = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    if not samples:
+        return {"n": 0}
+    return {
+        "n": len(samples),
+        "total_s": round(sum(samples), 6),
+        "mean_ms": round(mean(samples) * 1000, 4),
+        "p50_ms": round(_percentile(samples, 0.5) * 1000, 4),
+        "p95_ms": round(_percentile(samples, 0.95) * 1000, 4),
+        "p99_ms": round(_percentile(samples, 0.99) * 1000, 4),
+        "max_ms": round(samples[-1] * 1000, 4),
+    }
+
+
+def load_catalog(rows: int, seed: int) -> Result:
+    """Bulk-insert ``rows`` synthetic parts in one transaction, then build derived tables once."""
+
+    start = time.perf_counter()
+    conn = db.get_write_connection()
+    try:
+        with conn:
+            # Build indexes and the text index once after the load instead of
+            # row by row; the index DDL is read back from the schema.
+            indexes = conn.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'parts' AND sql IS NOT NULL"
+            ).fetchall()
+            for name, _ in indexes:
+                conn.execute(f"DROP INDEX {name}")
+            for trigger in _FTS_TRIGGERS:
+                conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+            conn.execute("DROP TABLE IF EXISTS parts_fts")
+            items = generate_items(rows, seed)
+            while True:
+                chunk = [item.as_row() for item in islice(items, LOAD_CHUNK)]
+                if not chunk:
+                    break
+                conn.executemany(_INSERT_SQL, chunk)
+            loaded = time.perf_counter()
+            for _, sql in indexes:
+                conn.execute(sql)
+            rebuild_price_stats(conn)
+            rebuild_catalog_tree(conn)
+            db.create_text_index(conn.cursor())
+            bump_meta(conn, DATA_GENERATION)
+    finally:
+        conn.close()
+    elapsed = time.perf_counter() - start
+    return {
+        "rows": rows,
+        "insert_s": round(loaded - start, 3),
+        "index_s": round(elapsed - (loaded - start), 3),
+        "total_s": round(elapsed, 3),
+    }
+
+
+def bench_ingest(rows: int, seed: int, batch_size: int) -> Result:
+    start = time.perf_counter()
+    inserted, updated = db.upsert_parts(generate_items(rows, seed), batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    return {
+        "rows": rows,
+        "batch_size": batch_size,
+        "inserted": inserted,
+        "updated": updated,
+        "total_s": round(elapsed, 3),
+        "rows_per_s": round(rows / elapsed, 1) if elapsed else None,
+    }
+
+
+def bench_upsert_part(count: int, seed: int) -> Result:
+    items = list(generate_items(count, seed + 1))
+    for n, item in enumerate(items):
+        item["url"] += f"?upsert={n}"
+    return latency(db.upsert_part, ((item,) for item in items))
+
+
+def bench_queries(conn: sqlite3.Connection, rows: int, samples: int, seed: int) -> Dict[str, Result]:
+    articles = sample_articles(samples, rows, seed)
+    leaves = sample_leaves(conn, samples, seed)
+    prefixes = [article[:4] for article in articles]
+    results = {
+        "fetch_offers_by_article.exact": latency(
+            search_api.fetch_offers_by_article, ((conn, a, "exact", search_api.OFFER_FIELDS, None, 100) for a in articles)
+        ),
+        "fetch_offers_by_article.prefix": latency(
+            search_api.fetch_offers_by_article, ((conn, p, "prefix", search_api.OFFER_FIELDS, None, 100) for p in prefixes)
+        ),
+        "compute_sonver_price.exact": latency(
+            search_api.compute_sonver_price, ((conn, a, "exact") for a in articles)
+        ),
+        "compute_sonver_price.prefix": latency(
+            search_api.compute_sonver_price, ((conn, p, "prefix") for p in prefixes)
+        ),
+        "build_tree": latency(search_api.build_tree, ((conn,) for _ in range(max(1, samples // 20)))),
+        "search_tree": latency(
+            search_api.search_tree,
+            ((conn, b, m, g, c, search_api.OFFER_FIELDS, None, 100) for b, m, g, c in leaves),
+        ),
+    }
+    substring_samples = articles[: max(1, samples // 20)]
+    results["fetch_offers_by_article.substring"] = latency(
+        search_api.fetch_offers_by_article,
+        ((conn, a[2:7], "substring", search_api.OFFER_FIELDS, None, 100) for a in substring_samples),
+    )
+    return results
+
+
+def bench_parsers(pages: int, seed: int) -> Dict[str, Result]:
+    scraper = RRRScraper()
+    html_pages = [results_page_html(seed=seed + i) for i in range(pages)]
+    json_pages = [search_json_items(seed=seed + i) for i in range(pages)]
+    return {
+        "rrr.parse_parts_page": {
+            "parser": scraper.parser,
+            **latency(
+                scraper.parse_parts_page, ((page, "VW", "Golf", "V", "Headlights") for page in html_pages)
+            ),
+        },
+        "rrr.parse_json_item": latency(
+            scraper.parse_json_item,
+            ((item, "VW", "Golf", "V", "Headlights") for page in json_pages for item in page),
+        ),
+        "normalize_item": latency(
+            normalize_item,
+            ((scraper.parse_json_item(item, "VW", "Golf", "V", "Headlights"),) for page in json_pages for item in page),
+        ),
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True, cwd=Path(__file__).parent
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def _fresh_db(path: Path) -> None:
+    db.DB_FILE = path
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{path}{suffix}").unlink(missing_ok=True)
+    db.init_db()
+
+
+def run(
+    db_file: Path,
+    rows: int,
+    samples: int = 500,
+    pages: int = 50,
+    batch_size: int = 1000,
+    seed: int = 0,
+    reuse: bool = False,
+    ingest_rows: int = 100_000,
+) -> Result:
+    db_file = Path(db_file)
+    results: Result = {}
+    if ingest_rows > 0:
+        _fresh_db(db_file.with_name(f"{db_file.stem}-ingest{db_file.suffix}"))
+        results["ingest.upsert_parts"] = bench_ingest(ingest_rows, seed, batch_size)
+        results["ingest.upsert_part"] = bench_upsert_part(min(samples, 500), seed)
+
+    db.DB_FILE = db_file
+    if not (reuse and db.DB_FILE.exists()):
+        _fresh_db(db_file)
+        results["setup.load_catalog"] = load_catalog(rows, seed)
+    db.init_db()
+
+    conn = db.get_connection()
+    try:
+        table_rows = conn.execute("SELECT COUNT(*) FROM parts").fetchone()[0]
+        results.update(bench_queries(conn, table_rows, samples, seed))
+    finally:
+        conn.close()
+    results.update(bench_parsers(pages, seed))
+    results["pipeline.parse_normalize_params"] = pipeline.run(items=rows, batch_size=batch_size, seed=seed)
+
+    return {
+        "meta": {
+            "rows": table_rows,
+            "samples": samples,
+            "seed": seed,
+            "revision": _git_revision(),
+            "python": sys.version.split()[0],
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": results,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark SONVER hot paths on a synthetic catalog")
+    parser.add_argument("--rows", type=int, default=100_000, help="synthetic parts rows (1e5 to 1e7)")
+    parser.add_argument("--db", type=Path, default=Path("bench_sonver.db"), help="database file to build")
+    parser.add_argument("--reuse", action="store_true", help="reuse an existing --db instead of regenerating it")
+    parser.add_argument("--samples", type=int, default=500, help="queries per timed query path")
+    parser.add_argument("--pages", type=int, default=50, help="generated pages per parser benchmark")
+    parser.add_argument(
+        "--ingest-rows",
+        type=int,
+        default=100_000,
+        help="rows ingested through PartWriter into a separate database (0 to skip)",
+    )
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = run(
+        args.db, args.rows, args.samples, args.pages, args.batch_size, args.seed, args.reuse, args.ingest_rows
+    )
+    text = json.dumps(report, indent=2)
+    if args.out:
+        args.out.write_text(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
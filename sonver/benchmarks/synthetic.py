@@ -0,0 +1,160 @@
+"""Synthetic catalog data for benchmarks.
+
+Generates ``parts`` rows with production-like skew: a few brands and part
+numbers account for most listings (Zipf-distributed), and prices follow a
+per-category log-normal distribution. The same generator also renders
+rrr.lt-like HTML result pages and ``/api/search`` JSON payloads for the
+parser benchmarks.
+"""
+
+import bisect
+import itertools
+import math
+import random
+import sqlite3
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+from ..normalize import normalize_item
+from ..record import PartRecord
+
+BRANDS = (
+    "Volkswagen", "Audi", "BMW", "Mercedes-Benz", "Opel", "Ford", "Toyota", "Renault",
+    "Peugeot", "Skoda", "Volvo", "Citroen", "Nissan", "Honda", "Mazda", "Fiat",
+    "Hyundai", "Kia", "Seat", "Subaru", "Mitsubishi", "Land Rover", "Jaguar", "Lexus",
+)
+CATEGORIES = (
+    ("Headlights", 120.0), ("Tail lights", 60.0), ("Mirrors", 45.0), ("Bumpers", 90.0),
+    ("Doors", 150.0), ("Engines", 900.0), ("Gearboxes", 450.0), ("Brake calipers", 35.0),
+    ("Alternators", 70.0), ("Starters", 55.0), ("Radiators", 50.0), ("Turbochargers", 300.0),
+    ("Seats", 110.0), ("Wheels", 80.0), ("ECUs", 140.0), ("Injectors", 40.0),
+)
+PLATFORMS = ("RRR", "MLAUTO", "AUTOPLIUS", "MOBILEDE")
+LOCATIONS = ("Vilnius", "Kaunas", "Klaipeda", "Riga", "Tallinn", "Berlin", "Warsaw")
+WORDS = ("left", "right", "front", "rear", "xenon", "led", "heated", "electric", "used", "original", "OEM")
+
+
+class Zipf:
+    """Sample indexes ``0..n-1`` with probability proportional to ``1 / (i + 1) ** s``."""
+
+    def __init__(self, n: int, s: float = 1.1) -> None:
+        weights = [1.0 / (i + 1) ** s for i in range(n)]
+        self._cumulative = list(itertools.accumulate(weights))
+
+    def sample(self, rng: random.Random) -> int:
+        return bisect.bisect_left(self._cumulative, rng.random() * self._cumulative[-1])
+
+
+@lru_cache(maxsize=1 << 16)
+def article_number(index: int) -> str:
+    """Deterministic OEM-style part number for an article index."""
+
+    rng = random.Random(index)
+    return f"{rng.randint(1, 9)}{rng.choice('ABCDGKLM')}{rng.randint(0, 9)} {rng.randint(100, 999)} {rng.randint(100, 999)} {rng.choice(['', 'A', 'AB', 'C'])}".strip()
+
+
+def _article_variant(article: str, rng: random.Random) -> str:
+    # Listings spell the same number differently; article_key folds these.
+    choice = rng.random()
+    if choice < 0.5:
+        return article
+    if choice < 0.7:
+        return article.replace(" ", "")
+    if choice < 0.85:
+        return article.replace(" ", "-").lower()
+    return article.replace(" ", ".")
+
+
+def generate_items(rows: int, seed: int = 0) -> Iterator[PartRecord]:
+    """Yield ``rows`` normalized part records."""
+
+    rng = random.Random(seed)
+    brands = Zipf(len(BRANDS), 1.0)
+    categories = Zipf(len(CATEGORIES), 0.6)
+    articles = Zipf(max(10, rows // 8), 1.05)
+    now = datetime.utcnow().isoformat()
+    for i in range(rows):
+        brand = BRANDS[brands.sample(rng)]
+        model_index = rng.randint(1, 12)
+        model = f"{brand[:3].upper()}-{model_index}"
+        generation_index = rng.randint(0, model_index % 3 + 1)
+        generation = f"{model} {'I' * (generation_index + 1)} ({1995 + 6 * generation_index + model_index % 5})"
+        category, base_price = CATEGORIES[categories.sample(rng)]
+        article = _article_variant(article_number(articles.sample(rng)), rng)
+        price = round(base_price * math.exp(rng.gauss(0, 0.6)), 2) if rng.random() > 0.03 else 0.0
+        platform = PLATFORMS[min(3, int(rng.expovariate(1.2)))]
+        item = normalize_item(
+            {
+                "platform": platform,
+                "article": article,
+                "brand": brand,
+                "model": model,
+                "generation": generation,
+                "category": category,
+                "description": f"{category} {' '.join(rng.sample(WORDS, 3))} {brand} {model}",
+                "price": price,
+                "currency": "EUR",
+                "location": rng.choice(LOCATIONS),
+                "url": f"https://{platform.lower()}.example/part/{i}",
+                "image_url": f"https://img.{platform.lower()}.example/{i}.jpg",
+            }
+        )
+        item.last_seen = now
+        yield item
+
+
+def sample_leaves(conn: sqlite3.Connection, count: int, seed: int = 0) -> List[Tuple[str, str, str, str]]:
+    rows = conn.execute("SELECT brand, model, generation, category FROM catalog_tree").fetchall()
+    rng = random.Random(seed)
+    return [tuple(r) for r in rng.sample(rows, min(count, len(rows)))]
+
+
+def sample_articles(count: int, rows: int, seed: int = 0) -> List[str]:
+    """Part numbers drawn with the same skew as :func:`generate_items`."""
+
+    rng = random.Random(seed)
+    articles = Zipf(max(10, rows // 8), 1.05)
+    return [article_number(articles.sample(rng)) for _ in range(count)]
+
+
+def results_page_html(items: int = 50, seed: int = 0) -> str:
+    """Build an rrr.lt-like results page with ``items`` listings."""
+
+    rng = random.Random(seed)
+    rows = []
+    for i in range(items):
+        code = f"{rng.randint(100, 999)}-{rng.randint(1000, 9999)}"
+        price = f"{rng.randint(5, 900)},{rng.randint(0, 99):02d}"
+        rows.append(
+            f'<div class="search-item card" data-article="{code}">'
+            f'<a href="/en/part/{i}"><img src="https://img.rrr.lt/{i}.jpg" alt=""></a>'
+            f'<div class="search-item__body"><h3 class="search-item__title"> Part {code} left </h3>'
+            f'<span class="search-item__location">Vilnius</span>'
+            f'<div class="search-item__price">{price}&nbsp;EUR</div></div></div>'
+        )
+    filler = "".join(f'<li><a href="/en/cat/{i}">Category {i}</a></li>' for i in range(200))
+    return (
+        "<!DOCTYPE html><html><head><title>Search</title>"
+        "<script>var x = 1;</script></head><body>"
+        f'<header><nav><ul>{filler}</ul></nav></header><main><div class="results">{"".join(rows)}</div>'
+        f"</main><footer>{filler}</footer></body></html>"
+    )
+
+
+def search_json_items(items: int = 50, seed: int = 0) -> Sequence[Dict[str, Any]]:
+    """Build the ``items`` array of an ``/api/search`` response."""
+
+    rng = random.Random(seed)
+    return [
+        {
+            "code": f"{rng.randint(100, 999)}-{rng.randint(1000, 9999)}",
+            "title": f"Part {i} {' '.join(rng.sample(WORDS, 2))}",
+            "price": round(rng.uniform(5, 900), 2),
+            "currencyCode": "EUR",
+            "city": rng.choice(LOCATIONS),
+            "link": f"https://rrr.lt/en/part/{i}",
+            "imageUrl": f"https://img.rrr.lt/{i}.jpg",
+        }
+        for i in range(items)
+    ]
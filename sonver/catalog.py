@@ -0,0 +1,117 @@
+"""Materialized brand/model/generation/category tree.
+
+``catalog_tree`` holds one row per distinct leaf, written at ingest time,
+so ``/tree`` never has to scan ``parts``. Any change to the set of leaves
+bumps the ``tree_version`` meta counter, which the API exposes as an ETag.
+"""
+
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .meta import TREE_VERSION, bump_meta
+
+Leaf = Tuple[str, str, str, str]
+Tree = Dict[str, Dict[str, Dict[str, List[str]]]]
+
+
+def tree_leaf(brand: Optional[str], model: Optional[str], generation: Optional[str], category: Optional[str]) -> Leaf:
+    """Map raw part columns to the labels shown in the tree."""
+
+    return (brand or "Unknown", model or "Unknown", generation or "Unknown", category or "Misc")
+
+
+def add_tree_leaves(conn: sqlite3.Connection, leaves: Iterable[Leaf]) -> bool:
+    """Record new leaves; bumps the tree version and returns True if any were new."""
+
+    cur = conn.cursor()
+    cur.executemany(
+        "INSERT OR IGNORE INTO catalog_tree (brand, model, generation, category) VALUES (?, ?, ?, ?)",
+        [tree_leaf(*leaf) for leaf in leaves],
+    )
+    if cur.rowcount > 0:
+        bump_meta(conn, TREE_VERSION)
+        return True
+    return False
+
+
+def remove_empty_leaves(conn: sqlite3.Connection, leaves: Iterable[Leaf]) -> bool:
+    """Drop leaves no part belongs to any more; bumps the tree version and returns True if any were."""
+
+    cur = conn.cursor()
+    removed = 0
+    for leaf in leaves:
+        cur.execute(
+            """
+            SELECT EXISTS (
+                SELECT 1 FROM parts WHERE brand IS ? AND model IS ? AND generation IS ? AND category IS ?
+            )
+            """,
+            leaf,
+        )
+        if not cur.fetchone()[0]:
+            cur.execute(
+                "DELETE FROM catalog_tree WHERE brand = ? AND model = ? AND generation = ? AND category = ?",
+                tree_leaf(*leaf),
+            )
+            removed += cur.rowcount
+    if removed:
+        bump_meta(conn, TREE_VERSION)
+        return True
+    return False
+
+
+def rebuild_catalog_tree(conn: sqlite3.Connection) -> None:
+    """Rebuild ``catalog_tree`` from ``parts`` and bump the tree version."""
+
+    cur = conn.cursor()
+    cur.execute("DELETE FROM catalog_tree")
+    cur.execute(
+        """
+        INSERT OR IGNORE INTO catalog_tree (brand, model, generation, category)
+        SELECT DISTINCT
+            COALESCE(NULLIF(brand, ''), 'Unknown'),
+            COALESCE(NULLIF(model, ''), 'Unknown'),
+            COALESCE(NULLIF(generation, ''), 'Unknown'),
+            COALESCE(NULLIF(category, ''), 'Misc')
+        FROM parts
+        """
+    )
+    bump_meta(conn, TREE_VERSION)
+
+
+def load_tree(conn: sqlite3.Connection) -> Tree:
+    tree: Tree = {}
+    cur = conn.execute("SELECT brand, model, generation, category FROM catalog_tree ORDER BY 1, 2, 3, 4")
+    for brand, model, generation, category in cur:
+        tree.setdefault(brand, {}).setdefault(model, {}).setdefault(generation, []).append(category)
+    return tree
+
+
+def list_brands(conn: sqlite3.Connection) -> List[str]:
+    cur = conn.execute("SELECT DISTINCT brand FROM catalog_tree ORDER BY brand")
+    return [r[0] for r in cur]
+
+
+def list_models(conn: sqlite3.Connection, brand: str) -> List[str]:
+    cur = conn.execute("SELECT DISTINCT model FROM catalog_tree WHERE brand = ? ORDER BY model", (brand,))
+    return [r[0] for r in cur]
+
+
+def list_generations(conn: sqlite3.Connection, brand: str, model: str) -> List[str]:
+    cur = conn.execute(
+        "SELECT DISTINCT generation FROM catalog_tree WHERE brand = ? AND model = ? ORDER BY generation",
+        (brand, model),
+    )
+    return [r[0] for r in cur]
+
+
+def list_categories(conn: sqlite3.Connection, brand: str, model: str, generation: str) -> List[str]:
+    cur = conn.execute(
+        """
+        SELECT category FROM catalog_tree
+        WHERE brand = ? AND model = ? AND generation = ?
+        ORDER BY category
+        """,
+        (brand, model, generation),
+    )
+    return [r[0] for r in cur]
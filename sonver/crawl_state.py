@@ -0,0 +1,245 @@
+"""Persistent crawl checkpoints for resumable and incremental crawls.
+
+Each crawl of a platform is a row in ``crawl_runs``; per-leaf progress
+(brand/model/generation/category cursor, next page, first-page fingerprint)
+lives in ``crawl_state``. Progress is buffered in memory and written by
+:meth:`CrawlState.save`, which :class:`~sonver.db.PartWriter` calls inside
+the same transaction as the items it covers, so a checkpoint never runs
+ahead of the data on disk.
+
+When a crawl runs in worker processes (see :mod:`sonver.orchestrator`),
+the writer hands each worker a snapshot of the checkpoint
+(:meth:`~CrawlState.progress`); workers send new progress back alongside
+the items it covers (:meth:`~CrawlState.take_progress`) and the writer
+applies it with :meth:`~CrawlState.merge`.
+
+A run whose requests failed stays ``running`` and is resumed by the next
+crawl, at most ``max_attempts`` times in all. On its final attempt it is
+finished regardless, with status ``partial``. Leaves that failed keep
+``done = 0``, and their stored rows count as seen (see
+:meth:`~CrawlState.leaf_failed`), so they do not expire.
+"""
+
+import hashlib
+import logging
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .price_stats import CategoryKey
+
+logger = logging.getLogger(__name__)
+
+# Times a run is begun, counting resumes, before it is finished even with failures.
+MAX_ATTEMPTS = 3
+
+LeafState = Tuple[int, bool, Optional[str]]
+Progress = Tuple[Dict[str, LeafState], Dict[str, CategoryKey]]
+
+
+def leaf_key(*ids: str) -> str:
+    """Stable key for a crawl leaf built from its brand/model/generation/category ids."""
+
+    return "/".join(str(i) for i in ids)
+
+
+def page_fingerprint(items: Sequence[Dict[str, Any]]) -> str:
+    """Fingerprint a results page by its item count and listing identities."""
+
+    digest = hashlib.sha1()
+    for item in items:
+        digest.update(f"{item.get('url', '')}\x1f{item.get('article', '')}\n".encode())
+    return f"{len(items)}:{digest.hexdigest()[:16]}"
+
+
+class CrawlState:
+    """Checkpoint store for one platform's crawl."""
+
+    def __init__(
+        self,
+        conn: Optional[sqlite3.Connection],
+        platform: str,
+        incremental: bool = False,
+        max_attempts: int = MAX_ATTEMPTS,
+    ) -> None:
+        self.conn = conn
+        self.platform = platform
+        self.incremental = incremental
+        self.max_attempts = max(1, max_attempts)
+        self.run_id: Optional[int] = None
+        self.attempts = 0
+        self._leaves: Dict[str, LeafState] = {}
+        self._previous_fingerprints: Dict[str, Optional[str]] = {}
+        self._dirty: Dict[str, LeafState] = {}
+        self._unchanged: Dict[str, CategoryKey] = {}
+
+    # -----------------------
+    # Run lifecycle
+    # -----------------------
+    def begin(self, resume: bool = True) -> None:
+        """Resume the platform's unfinished run, or start a fresh one."""
+
+        now = datetime.utcnow().isoformat()
+        with self.conn:
+            last = self.conn.execute(
+                "SELECT id, status FROM crawl_runs WHERE platform = ? ORDER BY id DESC LIMIT 1",
+                (self.platform,),
+            ).fetchone()
+            if last and last[1] == "running" and resume:
+                self.run_id = last[0]
+                self.conn.execute("UPDATE crawl_runs SET attempts = attempts + 1 WHERE id = ?", (self.run_id,))
+                self.attempts = self.conn.execute(
+                    "SELECT attempts FROM crawl_runs WHERE id = ?", (self.run_id,)
+                ).fetchone()[0]
+                logger.info("Resuming %s crawl run %s (attempt %s)", self.platform, self.run_id, self.attempts)
+            else:
+                if last and last[1] == "running":
+                    self.conn.execute("UPDATE crawl_runs SET status = 'abandoned' WHERE id = ?", (last[0],))
+                self.conn.execute(
+                    "UPDATE crawl_state SET next_page = 1, done = 0 WHERE platform = ?", (self.platform,)
+                )
+                cur = self.conn.execute(
+                    "INSERT INTO crawl_runs (platform, status, started_at) VALUES (?, 'running', ?)",
+                    (self.platform, now),
+                )
+                self.run_id = cur.lastrowid
+                self.attempts = 1
+        self.load()
+
+    def load(self, leaves: Optional[Dict[str, LeafState]] = None) -> None:
+        """Load leaf progress from ``crawl_state``, or from :meth:`progress` of another instance."""
+
+        if leaves is None:
+            rows = self.conn.execute(
+                "SELECT leaf, next_page, done, fingerprint FROM crawl_state WHERE platform = ?",
+                (self.platform,),
+            )
+            leaves = {leaf: (next_page, bool(done), fingerprint) for leaf, next_page, done, fingerprint in rows}
+        for leaf, state in leaves.items():
+            self._leaves[leaf] = state
+            self._previous_fingerprints[leaf] = state[2]
+
+    @property
+    def final_attempt(self) -> bool:
+        """True when the run must be finished even if requests failed."""
+
+        return self.attempts >= self.max_attempts
+
+    def finish(self, status: str = "complete") -> None:
+        """Persist outstanding progress and mark the run ``complete`` (or ``partial``)."""
+
+        with self.conn:
+            self.save(self.conn)
+            self.conn.execute(
+                "UPDATE crawl_runs SET status = ?, finished_at = ? WHERE id = ?",
+                (status, datetime.utcnow().isoformat(), self.run_id),
+            )
+
+    # -----------------------
+    # Leaf progress
+    # -----------------------
+    def is_done(self, leaf: str) -> bool:
+        return self._leaves.get(leaf, (1, False, None))[1]
+
+    def next_page(self, leaf: str) -> int:
+        return self._leaves.get(leaf, (1, False, None))[0]
+
+    def is_unchanged(self, leaf: str, first_page: Sequence[Dict[str, Any]]) -> bool:
+        """True when incremental mode is on and the first page matches the last crawl."""
+
+        if not self.incremental:
+            return False
+        previous = self._previous_fingerprints.get(leaf)
+        return previous is not None and previous == page_fingerprint(first_page)
+
+    def page_done(self, leaf: str, page: int, items: Sequence[Dict[str, Any]]) -> None:
+        _, done, fingerprint = self._leaves.get(leaf, (1, False, None))
+        if page == 1:
+            fingerprint = page_fingerprint(items)
+        self._set(leaf, (page + 1, done, fingerprint))
+
+    def leaf_done(self, leaf: str) -> None:
+        next_page, done, fingerprint = self._leaves.get(leaf, (1, False, None))
+        if not done:
+            self._set(leaf, (next_page, True, fingerprint))
+
+    def leaf_unchanged(self, leaf: str, category: CategoryKey) -> None:
+        """Record that ``leaf`` was shallow-scanned; its stored rows count as seen.
+
+        ``category`` is the brand/model/generation/category the leaf's items
+        are stored under. :meth:`save` stamps those rows with this run, so
+        expiring unseen rows after the crawl keeps them.
+        """
+
+        self._unchanged[leaf] = category
+
+    def leaf_failed(self, leaf: str, category: CategoryKey) -> None:
+        """Record that requests of ``leaf`` failed; it stays pending.
+
+        Like :meth:`leaf_unchanged`, its stored rows count as seen by this
+        run, so a run finished after its final attempt does not expire them.
+        """
+
+        self._unchanged[leaf] = category
+
+    def _set(self, leaf: str, state: LeafState) -> None:
+        self._leaves[leaf] = state
+        self._dirty[leaf] = state
+
+    def progress(self) -> Dict[str, LeafState]:
+        """Snapshot of all leaf progress, for :meth:`load` in another process."""
+
+        return dict(self._leaves)
+
+    def take_progress(self) -> Progress:
+        """Hand over buffered progress, e.g. to send it to another process."""
+
+        progress = (self._dirty, self._unchanged)
+        self._dirty, self._unchanged = {}, {}
+        return progress
+
+    def merge(self, progress: Progress) -> None:
+        """Buffer progress recorded by another :class:`CrawlState` of this platform."""
+
+        leaves, unchanged = progress
+        for leaf, state in leaves.items():
+            self._set(leaf, state)
+        self._unchanged.update(unchanged)
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._dirty or self._unchanged)
+
+    def save(self, conn: sqlite3.Connection) -> None:
+        """Write buffered progress; the caller owns the transaction."""
+
+        if self._unchanged and self.run_id is not None:
+            conn.executemany(
+                """
+                UPDATE parts SET crawl_generation = ?
+                WHERE brand = ? AND model = ? AND generation = ? AND category = ?
+                  AND platform = ? AND crawl_generation < ?
+                """,
+                [(self.run_id, *category, self.platform, self.run_id) for category in self._unchanged.values()],
+            )
+        self._unchanged = {}
+        if not self._dirty:
+            return
+        now = datetime.utcnow().isoformat()
+        rows: List[Tuple[Any, ...]] = [
+            (self.platform, leaf, next_page, int(done), fingerprint, now)
+            for leaf, (next_page, done, fingerprint) in self._dirty.items()
+        ]
+        conn.executemany(
+            """
+            INSERT INTO crawl_state (platform, leaf, next_page, done, fingerprint, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(platform, leaf) DO UPDATE SET
+                next_page = excluded.next_page,
+                done = excluded.done,
+                fingerprint = excluded.fingerprint,
+                updated_at = excluded.updated_at
+            """,
+            rows,
+        )
+        self._dirty = {}
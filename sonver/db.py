@@ -1,19 +1,188 @@
+"""SQLite schema, connections and batched part upserts for sonver.db."""
+
+import json
+import logging
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, Iterable
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .catalog import add_tree_leaves, rebuild_catalog_tree, remove_empty_leaves
+from .crawl_state import CrawlState
+from .meta import DATA_GENERATION, bump_meta
+from .normalize import normalize_article
+from .price_stats import (
+    article_stats_key,
+    category_stats_key,
+    mark_stale,
+    rebuild_price_stats,
+    refresh_stale_price_stats,
+)
+from .record import PART_FIELDS, PartRecord
+
+logger = logging.getLogger(__name__)
 
 DB_FILE = Path(__file__).resolve().parent / "sonver.db"
 
+# Bump whenever init_db gains DDL or a backfill, so existing databases are
+# migrated once and up-to-date ones skip the DDL entirely.
+SCHEMA_VERSION = 11
+
+# Column order of the upsert; PartRecord stores its fields in the same order.
+PART_COLUMNS = PART_FIELDS
+
+_ARTICLE_KEY = PART_COLUMNS.index("article_key")
+_TREE_START = PART_COLUMNS.index("brand")
+_TREE_END = PART_COLUMNS.index("category") + 1
+
+# Parameters are ``part_params(item)`` followed by the crawl generation.
+# Generations are crawl run ids and only grow, so MAX keeps the newest even
+# when an import without a crawl (generation 0) touches the row.
+UPSERT_PART_SQL = """
+INSERT INTO parts (
+    platform, article, article_key, brand, model, generation, category, description,
+    price, currency, location, url, image_url, last_seen, crawl_generation
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(platform, article, url) DO UPDATE SET
+    article_key = excluded.article_key,
+    brand = excluded.brand,
+    model = excluded.model,
+    generation = excluded.generation,
+    category = excluded.category,
+    description = excluded.description,
+    price = excluded.price,
+    currency = excluded.currency,
+    location = excluded.location,
+    image_url = excluded.image_url,
+    last_seen = excluded.last_seen,
+    crawl_generation = MAX(crawl_generation, excluded.crawl_generation)
+"""
+
+_PLATFORM = PART_COLUMNS.index("platform")
+_ARTICLE = PART_COLUMNS.index("article")
+_URL = PART_COLUMNS.index("url")
+
+# Article key and leaf of the existing rows a batch will update, looked up
+# on idx_unique_item before the upsert overwrites them.
+PREVIOUS_KEYS_SQL = """
+SELECT p.article_key, p.brand, p.model, p.generation, p.category
+FROM json_each(?) AS j
+JOIN parts AS p
+  ON p.platform = json_extract(j.value, '$[0]')
+ AND p.article = json_extract(j.value, '$[1]')
+ AND p.url = json_extract(j.value, '$[2]')
+"""
+
 
 def get_connection() -> sqlite3.Connection:
     conn = sqlite3.connect(DB_FILE)
     conn.row_factory = sqlite3.Row
+    conn.create_function("normalize_article", 1, normalize_article, deterministic=True)
     return conn
 
 
+def get_write_connection() -> sqlite3.Connection:
+    """Return a connection tuned for bulk ingest (WAL, relaxed fsync)."""
+
+    conn = get_connection()
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class ConnectionPool:
+    """Fixed-size pool of read-only connections for request handlers.
+
+    Connections are opened lazily with ``query_only``, memory-mapped I/O and
+    a larger page cache, and keep a per-connection prepared statement cache
+    of ``cached_statements`` entries. They may be used from any thread, but
+    only by one thread at a time.
+
+    ``path`` defaults to the live database. With ``immutable`` the file is
+    opened with ``immutable=1``, so reads take no locks and never check for
+    changes; use it only for files nothing writes to, such as snapshots.
+    Connections returned after :meth:`close` are closed instead of pooled,
+    so a pool can be retired while requests still hold its connections.
+    """
+
+    def __init__(
+        self,
+        size: int = 8,
+        mmap_size: int = 256 * 1024 * 1024,
+        cache_size_kib: int = 64 * 1024,
+        cached_statements: int = 256,
+        path: Optional[Path] = None,
+        immutable: bool = False,
+    ) -> None:
+        self.size = max(1, size)
+        self.mmap_size = mmap_size
+        self.cache_size_kib = cache_size_kib
+        self.cached_statements = cached_statements
+        self.path = path
+        self.immutable = immutable
+        self._closed = False
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+
+    def _connect(self) -> sqlite3.Connection:
+        path = Path(self.path or DB_FILE)
+        if self.immutable:
+            conn = sqlite3.connect(
+                f"{path.resolve().as_uri()}?mode=ro&immutable=1",
+                uri=True,
+                check_same_thread=False,
+                cached_statements=self.cached_statements,
+            )
+        else:
+            conn = sqlite3.connect(path, check_same_thread=False, cached_statements=self.cached_statements)
+        conn.row_factory = sqlite3.Row
+        conn.create_function("normalize_article", 1, normalize_article, deterministic=True)
+        conn.execute("PRAGMA query_only=ON")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size={-int(self.cache_size_kib)}")
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection, blocking while all ``size`` are in use."""
+
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()
+                if self._closed:
+                    conn.close()
+                else:
+                    self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close(self) -> None:
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
 def init_db() -> None:
     conn = get_connection()
     cur = conn.cursor()
+    cur.execute("PRAGMA user_version")
+    if cur.fetchone()[0] == SCHEMA_VERSION:
+        conn.close()
+        return
+    cur.execute("PRAGMA journal_mode=WAL")
     cur.execute(
         """
         CREATE TABLE IF NOT EXISTS parts (
@@ -34,81 +203,396 @@ def init_db() -> None:
         )
         """
     )
+    _ensure_column(cur, "parts", "article_key", "TEXT")
+    cur.execute("UPDATE parts SET article_key = normalize_article(article) WHERE article_key IS NULL")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_article ON parts(article)")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_platform ON parts(platform)")
+    # (article_key, price) serves exact/prefix lookups and their price-ordered
+    # keyset pagination; it supersedes the single-column idx_article_key.
+    cur.execute("DROP INDEX IF EXISTS idx_article_key")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_article_key_price ON parts(article_key, price)")
+    _ensure_column(cur, "parts", "crawl_generation", "INTEGER NOT NULL DEFAULT 0")
+    # (platform, crawl_generation) finds a platform's unseen rows with one
+    # range scan; it supersedes the single-column idx_platform.
+    cur.execute("DROP INDEX IF EXISTS idx_platform")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_platform_generation ON parts(platform, crawl_generation)")
+    # Duplicate cluster and its size written by sonver.dedup; NULL and 1 for
+    # offers without duplicates.
+    _ensure_column(cur, "parts", "cluster_id", "INTEGER")
+    _ensure_column(cur, "parts", "cluster_size", "INTEGER NOT NULL DEFAULT 1")
+    cur.execute(
+        """
+        UPDATE parts SET cluster_size = clusters.size
+        FROM (
+            SELECT cluster_id, COUNT(*) AS size FROM parts WHERE cluster_id IS NOT NULL GROUP BY cluster_id
+        ) AS clusters
+        WHERE parts.cluster_id = clusters.cluster_id AND parts.cluster_size != clusters.size
+        """
+    )
     cur.execute("CREATE INDEX IF NOT EXISTS idx_price ON parts(price)")
     cur.execute("CREATE INDEX IF NOT EXISTS idx_category ON parts(category)")
     cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_unique_item ON parts(platform, article, url)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_tree ON parts(brand, model, generation, category)")
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS price_stats (
+            article_key TEXT NOT NULL DEFAULT '',
+            brand TEXT NOT NULL DEFAULT '',
+            model TEXT NOT NULL DEFAULT '',
+            generation TEXT NOT NULL DEFAULT '',
+            category TEXT NOT NULL DEFAULT '',
+            count INTEGER,
+            min_price REAL,
+            max_price REAL,
+            median_price REAL,
+            sonver_price REAL,
+            updated_at TEXT,
+            PRIMARY KEY (article_key, brand, model, generation, category)
+        ) WITHOUT ROWID
+        """
+    )
+    # Stats keys written since their price_stats row was last recomputed.
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS stale_stats (
+            article_key TEXT NOT NULL,
+            brand TEXT NOT NULL,
+            model TEXT NOT NULL,
+            generation TEXT NOT NULL,
+            category TEXT NOT NULL,
+            PRIMARY KEY (article_key, brand, model, generation, category)
+        ) WITHOUT ROWID
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS catalog_tree (
+            brand TEXT NOT NULL,
+            model TEXT NOT NULL,
+            generation TEXT NOT NULL,
+            category TEXT NOT NULL,
+            PRIMARY KEY (brand, model, generation, category)
+        ) WITHOUT ROWID
+        """
+    )
+    cur.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS crawl_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            platform TEXT NOT NULL,
+            status TEXT NOT NULL,
+            started_at TEXT,
+            finished_at TEXT
+        )
+        """
+    )
+    # Times the run was begun, counting resumes; see CrawlState.final_attempt.
+    _ensure_column(cur, "crawl_runs", "attempts", "INTEGER NOT NULL DEFAULT 1")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_crawl_runs_platform ON crawl_runs(platform, id)")
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS crawl_state (
+            platform TEXT NOT NULL,
+            leaf TEXT NOT NULL,
+            next_page INTEGER NOT NULL DEFAULT 1,
+            done INTEGER NOT NULL DEFAULT 0,
+            fingerprint TEXT,
+            updated_at TEXT,
+            PRIMARY KEY (platform, leaf)
+        ) WITHOUT ROWID
+        """
+    )
+    create_text_index(cur)
+    # Cold storage for listings a complete crawl no longer returned.
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS parts_archive (
+            id INTEGER PRIMARY KEY,
+            platform TEXT,
+            article TEXT,
+            article_key TEXT,
+            brand TEXT,
+            model TEXT,
+            generation TEXT,
+            category TEXT,
+            description TEXT,
+            price REAL,
+            currency TEXT,
+            location TEXT,
+            url TEXT,
+            image_url TEXT,
+            last_seen TEXT,
+            crawl_generation INTEGER,
+            archived_at TEXT
+        )
+        """
+    )
+    # Duplicate cluster of the archived offer (see sonver.dedup).
+    _ensure_column(cur, "parts_archive", "cluster_id", "INTEGER")
+    # Probed image dimensions by URL and the largest photo per article key or
+    # catalog leaf (see sonver.images).
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS image_meta (
+            url TEXT PRIMARY KEY,
+            format TEXT,
+            width INTEGER,
+            height INTEGER,
+            status TEXT NOT NULL,
+            probed_at TEXT
+        ) WITHOUT ROWID
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS best_photo (
+            article_key TEXT NOT NULL DEFAULT '',
+            brand TEXT NOT NULL DEFAULT '',
+            model TEXT NOT NULL DEFAULT '',
+            generation TEXT NOT NULL DEFAULT '',
+            category TEXT NOT NULL DEFAULT '',
+            image_url TEXT NOT NULL,
+            width INTEGER,
+            height INTEGER,
+            PRIMARY KEY (article_key, brand, model, generation, category)
+        ) WITHOUT ROWID
+        """
+    )
+    # Per-category aggregates carried by imported exports (see sonver.importer).
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS category_summary (
+            source TEXT NOT NULL,
+            brand TEXT NOT NULL,
+            model TEXT NOT NULL,
+            generation TEXT NOT NULL DEFAULT '',
+            category TEXT NOT NULL,
+            item_count INTEGER,
+            median_price REAL,
+            average_price REAL,
+            sonver_price REAL,
+            cleanest_photo TEXT,
+            updated_at TEXT,
+            PRIMARY KEY (source, brand, model, generation, category)
+        ) WITHOUT ROWID
+        """
+    )
+    cur.execute(
+        """
+        SELECT EXISTS (SELECT 1 FROM parts),
+               EXISTS (SELECT 1 FROM price_stats),
+               EXISTS (SELECT 1 FROM catalog_tree)
+        """
+    )
+    has_parts, has_stats, has_tree = cur.fetchone()
+    if has_parts and not has_stats:
+        rebuild_price_stats(conn)
+    if has_parts and not has_tree:
+        rebuild_catalog_tree(conn)
+    bump_meta(conn, DATA_GENERATION)
+    cur.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
     conn.commit()
     conn.close()
 
 
-def _execute(conn: sqlite3.Connection, query: str, params: Iterable[Any]) -> None:
-    cur = conn.cursor()
-    cur.execute(query, params)
-    conn.commit()
-
-
-def upsert_part(item: Dict[str, Any]) -> bool:
-    """Insert or update a part. Returns True when inserted, False when updated."""
+def create_text_index(cur: sqlite3.Cursor) -> None:
+    """Create ``parts_fts``, an FTS5 index over ``parts`` kept current by triggers.
 
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT id FROM parts WHERE platform = ? AND article = ? AND url = ?",
-        (item.get("platform"), item.get("article"), item.get("url")),
-    )
-    existing = cur.fetchone()
+    The index is external-content, so it stores only the inverted index and
+    reads column values back from ``parts``. Upserts that leave the indexed
+    columns unchanged do not touch it. Bulk loads can drop the index and
+    its triggers and call this afterwards to index all rows at once.
+    """
 
-    if existing:
-        _execute(
-            conn,
+    cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'parts_fts'")
+    if cur.fetchone():
+        return
+    try:
+        cur.execute(
+            """
+            CREATE VIRTUAL TABLE parts_fts USING fts5(
+                description, brand, model, category,
+                content = 'parts', content_rowid = 'id',
+                tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+            )
             """
-            UPDATE parts
-            SET brand = ?, model = ?, generation = ?, category = ?, description = ?,
-                price = ?, currency = ?, location = ?, image_url = ?, last_seen = ?
-            WHERE id = ?
-            """,
-            (
-                item.get("brand"),
-                item.get("model"),
-                item.get("generation"),
-                item.get("category"),
-                item.get("description"),
-                item.get("price"),
-                item.get("currency"),
-                item.get("location"),
-                item.get("image_url"),
-                item.get("last_seen"),
-                existing["id"],
-            ),
         )
-        conn.close()
-        return False
-
-    _execute(
-        conn,
-        """
-        INSERT INTO parts (
-            platform, article, brand, model, generation, category, description,
-            price, currency, location, url, image_url, last_seen
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            item.get("platform"),
-            item.get("article"),
-            item.get("brand"),
-            item.get("model"),
-            item.get("generation"),
-            item.get("category"),
-            item.get("description"),
-            item.get("price"),
-            item.get("currency"),
-            item.get("location"),
-            item.get("url"),
-            item.get("image_url"),
-            item.get("last_seen"),
-        ),
+    except sqlite3.OperationalError as exc:  # pragma: no cover - SQLite built without FTS5
+        logger.warning("Full-text search disabled: %s", exc)
+        return
+    cur.execute(
+        """
+        CREATE TRIGGER parts_fts_insert AFTER INSERT ON parts BEGIN
+            INSERT INTO parts_fts (rowid, description, brand, model, category)
+            VALUES (new.id, new.description, new.brand, new.model, new.category);
+        END
+        """
     )
-    conn.close()
-    return True
+    cur.execute(
+        """
+        CREATE TRIGGER parts_fts_delete AFTER DELETE ON parts BEGIN
+            INSERT INTO parts_fts (parts_fts, rowid, description, brand, model, category)
+            VALUES ('delete', old.id, old.description, old.brand, old.model, old.category);
+        END
+        """
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER parts_fts_update AFTER UPDATE OF description, brand, model, category ON parts
+        WHEN old.description IS NOT new.description OR old.brand IS NOT new.brand
+          OR old.model IS NOT new.model OR old.category IS NOT new.category
+        BEGIN
+            INSERT INTO parts_fts (parts_fts, rowid, description, brand, model, category)
+            VALUES ('delete', old.id, old.description, old.brand, old.model, old.category);
+            INSERT INTO parts_fts (rowid, description, brand, model, category)
+            VALUES (new.id, new.description, new.brand, new.model, new.category);
+        END
+        """
+    )
+    cur.execute("INSERT INTO parts_fts (parts_fts) VALUES ('rebuild')")
+
+
+def _ensure_column(cur: sqlite3.Cursor, table: str, column: str, declaration: str) -> None:
+    """Add ``column`` to an existing ``table`` created by an older schema."""
+
+    cur.execute(f"PRAGMA table_info({table})")
+    if column not in {row[1] for row in cur.fetchall()}:
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
+
+def part_params(item: Union[PartRecord, Dict[str, Any]]) -> Tuple[Any, ...]:
+    """Return the ``UPSERT_PART_SQL`` parameter tuple for a normalized item."""
+
+    if isinstance(item, PartRecord):
+        if not item.article_key:
+            item.article_key = normalize_article(item.article)
+        return item.as_row()
+    if "article_key" not in item:
+        item = {**item, "article_key": normalize_article(item.get("article"))}
+    return tuple(item.get(column) for column in PART_COLUMNS)
+
+
+class PartWriter:
+    """Batched part writer that reuses one connection for a whole ingest.
+
+    Items are buffered and written ``batch_size`` at a time inside a single
+    transaction using a native ``ON CONFLICT`` upsert, together with the
+    ``catalog_tree`` leaves the batch touched. The ``price_stats`` keys it
+    touched are only marked stale and recomputed once by :meth:`close` (or
+    :meth:`refresh_stats`), so a batch costs the same however large the
+    table grows. ``inserted`` and ``updated`` keep running totals across all
+    flushed batches. When ``checkpoint`` is set, its buffered crawl progress
+    is saved in the same transaction as the batch and rows are stamped with
+    its run id as their ``crawl_generation``.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 500,
+        conn: Optional[sqlite3.Connection] = None,
+        checkpoint: Optional[CrawlState] = None,
+    ) -> None:
+        self.batch_size = max(1, batch_size)
+        self.conn = conn or get_write_connection()
+        self.checkpoint = checkpoint
+        self._owns_connection = conn is None
+        self._pending: List[Tuple[Any, ...]] = []
+        self.inserted = 0
+        self.updated = 0
+
+    def add(self, item: Union[PartRecord, Dict[str, Any]]) -> None:
+        self._pending.append(part_params(item))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def extend(self, items: Iterable[Union[PartRecord, Dict[str, Any]]]) -> None:
+        for item in items:
+            self.add(item)
+
+    def add_batch(self, items: Iterable[Union[PartRecord, Dict[str, Any]]]) -> None:
+        """Buffer ``items`` as a whole, flushing afterwards once ``batch_size`` is reached.
+
+        Unlike :meth:`extend`, a checkpoint covering ``items`` is never saved
+        before all of them are written.
+        """
+
+        self._pending.extend(map(part_params, items))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._pending:
+            if self.checkpoint is not None and self.checkpoint.dirty:
+                with self.conn:
+                    self.checkpoint.save(self.conn)
+            return
+        batch = self._pending
+        self._pending = []
+        generation = self.checkpoint.run_id if self.checkpoint is not None else None
+        cur = self.conn.cursor()
+        with self.conn:
+            # ids are AUTOINCREMENT, so every row above the previous maximum
+            # was inserted by this batch; the rest of the batch were updates.
+            cur.execute("SELECT COALESCE(MAX(id), 0) FROM parts")
+            max_id = cur.fetchone()[0]
+            # An update can move a row to another article key or leaf; the
+            # ones it leaves need their stats refreshed too.
+            cur.execute(
+                PREVIOUS_KEYS_SQL, (json.dumps([(row[_PLATFORM], row[_ARTICLE], row[_URL]) for row in batch]),)
+            )
+            previous = cur.fetchall()
+            cur.executemany(UPSERT_PART_SQL, [(*row, generation or 0) for row in batch])
+            cur.execute("SELECT COUNT(*) FROM parts WHERE id > ?", (max_id,))
+            inserted = cur.fetchone()[0]
+            leaves = {row[_TREE_START:_TREE_END] for row in batch}
+            article_keys = {row[_ARTICLE_KEY] for row in batch}
+            left_leaves = {tuple(row[1:]) for row in previous} - leaves
+            article_keys |= {row[0] for row in previous}
+            mark_stale(
+                self.conn,
+                [article_stats_key(key) for key in article_keys if key]
+                + [category_stats_key(*leaf) for leaf in leaves | left_leaves],
+            )
+            add_tree_leaves(self.conn, leaves)
+            remove_empty_leaves(self.conn, left_leaves)
+            bump_meta(self.conn, DATA_GENERATION)
+            if self.checkpoint is not None:
+                self.checkpoint.save(self.conn)
+        self.inserted += inserted
+        self.updated += len(batch) - inserted
+
+    def refresh_stats(self) -> None:
+        """Recompute the ``price_stats`` rows of every key written since the last refresh."""
+
+        with self.conn:
+            if refresh_stale_price_stats(self.conn):
+                bump_meta(self.conn, DATA_GENERATION)
+
+    def close(self) -> None:
+        try:
+            self.flush()
+            self.refresh_stats()
+        finally:
+            if self._owns_connection:
+                self.conn.close()
+
+    def __enter__(self) -> "PartWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        self.close()
+
+
+def upsert_parts(items: Iterable[Union[PartRecord, Dict[str, Any]]], batch_size: int = 500) -> Tuple[int, int]:
+    """Bulk insert or update parts. Returns ``(inserted, updated)`` counts."""
+
+    with PartWriter(batch_size=batch_size) as writer:
+        writer.extend(items)
+    return writer.inserted, writer.updated
+
+
+def upsert_part(item: Union[PartRecord, Dict[str, Any]]) -> bool:
+    """Insert or update a part. Returns True when inserted, False when updated."""
+
+    inserted, _ = upsert_parts([item], batch_size=1)
+    return inserted == 1
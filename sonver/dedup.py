@@ -0,0 +1,239 @@
+"""Offline clustering of duplicate offers into ``parts.cluster_id``.
+
+The same physical part is often listed on several platforms, or re-listed
+under a new URL on the same one. Each offer gets a MinHash signature over
+its description words plus its image URL; locality sensitive hashing
+splits the signature into bands, and only offers sharing a band are
+compared, so the work grows with the number of rows rather than with the
+number of pairs. Offers with neither description nor image are never
+compared. Band buckets are sorted by SQLite in a temporary
+table, which keeps memory to the signatures themselves (about 150 bytes per
+row).
+
+A candidate pair is a duplicate when its estimated Jaccard similarity
+reaches ``threshold`` and merging the two clusters keeps them consistent:
+article keys do not disagree and all prices stay within
+``max_price_ratio`` of each other. A shared article key alone is no
+evidence, since it is what the listings of one part number have in
+common. Duplicates are merged with union-find; every offer of a cluster
+gets the smallest id in it as
+``cluster_id`` and the number of offers in it as ``cluster_size``; offers
+without duplicates keep ``NULL`` and 1. ``/search`` collapses on the
+cluster and :mod:`sonver.price_stats` weights by its size.
+"""
+
+import argparse
+import hashlib
+import logging
+import math
+import random
+import re
+import sqlite3
+import zlib
+from array import array
+from collections import Counter
+from functools import lru_cache
+from itertools import groupby
+from typing import Iterable, List, Optional, Tuple
+
+from .db import get_write_connection, init_db
+from .meta import DATA_GENERATION, bump_meta
+from .price_stats import rebuild_price_stats
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 32
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+DEFAULT_THRESHOLD = 0.5
+DEFAULT_MAX_PRICE_RATIO = 1.5
+# Members of one band bucket each new member is compared with; bounds the
+# cost of very common buckets (identical boilerplate descriptions).
+MAX_BUCKET_COMPARISONS = 16
+WRITE_CHUNK = 10_000
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(0x50BE)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_WORD = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=1 << 16)
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+
+
+def offer_tokens(description: Optional[str], image_url: Optional[str]) -> List[str]:
+    """Shingles of one offer: lowercased description words and image URL."""
+
+    tokens = set(_WORD.findall((description or "").lower()))
+    if image_url:
+        tokens.add(f"img:{image_url}")
+    return sorted(tokens)
+
+
+def minhash(tokens: Iterable[str]) -> List[int]:
+    """32-bit MinHash signature of ``tokens``, ``NUM_PERM`` values long."""
+
+    hashes = [_token_hash(token) for token in tokens]
+    if not hashes:
+        return [0xFFFFFFFF] * NUM_PERM
+    return [min((a * h + b) % _PRIME for h in hashes) & 0xFFFFFFFF for a, b in _PERMUTATIONS]
+
+
+def _nanmin(a: float, b: float) -> float:
+    return b if math.isnan(a) else a if math.isnan(b) else min(a, b)
+
+
+def _nanmax(a: float, b: float) -> float:
+    return b if math.isnan(a) else a if math.isnan(b) else max(a, b)
+
+
+class _Offers:
+    """Signatures of every offer and the comparison fields of every cluster, in compact arrays.
+
+    ``low``, ``high`` and ``keys`` are only meaningful at cluster roots:
+    the price range and article key of the whole cluster.
+    """
+
+    def __init__(self) -> None:
+        self.ids = array("q")
+        self.low = array("d")
+        self.high = array("d")
+        self.keys = array("I")
+        self.signatures = array("I")
+
+    def add(self, row_id: int, price: Optional[float], article_key: Optional[str], signature: List[int]) -> None:
+        price = price if price and price > 0 else math.nan
+        self.ids.append(row_id)
+        self.low.append(price)
+        self.high.append(price)
+        self.keys.append(zlib.crc32(article_key.encode()) if article_key else 0)
+        self.signatures.extend(signature)
+
+    def similarity(self, a: int, b: int) -> float:
+        sig_a = self.signatures[a * NUM_PERM:(a + 1) * NUM_PERM]
+        sig_b = self.signatures[b * NUM_PERM:(b + 1) * NUM_PERM]
+        return sum(x == y for x, y in zip(sig_a, sig_b)) / NUM_PERM
+
+    def compatible(self, root_a: int, root_b: int, max_price_ratio: float) -> bool:
+        """Whether the clusters rooted at ``root_a`` and ``root_b`` may be merged."""
+
+        key_a, key_b = self.keys[root_a], self.keys[root_b]
+        if key_a and key_b and key_a != key_b:
+            return False
+        low = _nanmin(self.low[root_a], self.low[root_b])
+        high = _nanmax(self.high[root_a], self.high[root_b])
+        return math.isnan(low) or high <= low * max_price_ratio
+
+    def merge(self, parent: array, root_a: int, root_b: int) -> None:
+        root, other = min(root_a, root_b), max(root_a, root_b)
+        parent[other] = root
+        self.low[root] = _nanmin(self.low[root], self.low[other])
+        self.high[root] = _nanmax(self.high[root], self.high[other])
+        self.keys[root] = self.keys[root] or self.keys[other]
+
+
+def _find(parent: array, i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def _band_rows(ordinal: int, signature: List[int]) -> Iterable[Tuple[int, int]]:
+    for band in range(BANDS):
+        yield hash((band, *signature[band * ROWS:(band + 1) * ROWS])), ordinal
+
+
+def cluster_offers(
+    conn: sqlite3.Connection,
+    threshold: float = DEFAULT_THRESHOLD,
+    max_price_ratio: float = DEFAULT_MAX_PRICE_RATIO,
+) -> Tuple[int, int]:
+    """Recompute ``cluster_id`` and ``cluster_size`` for every offer. Returns ``(clusters, clustered offers)``."""
+
+    offers = _Offers()
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS dedup_band (band_hash INTEGER NOT NULL, ordinal INTEGER NOT NULL)")
+    conn.execute("DELETE FROM dedup_band")
+    pending: List[Tuple[int, int]] = []
+    for row_id, article_key, description, price, image_url in conn.execute(
+        "SELECT id, article_key, description, price, image_url FROM parts ORDER BY id"
+    ):
+        tokens = offer_tokens(description, image_url)
+        signature = minhash(tokens)
+        if tokens:
+            # Empty offers would all share one signature and one bucket.
+            pending.extend(_band_rows(len(offers.ids), signature))
+        offers.add(row_id, price, article_key, signature)
+        if len(pending) >= WRITE_CHUNK:
+            conn.executemany("INSERT INTO dedup_band VALUES (?, ?)", pending)
+            pending = []
+    conn.executemany("INSERT INTO dedup_band VALUES (?, ?)", pending)
+
+    # Ordinals follow id order and the smaller root always wins, so each
+    # cluster's root is its smallest id.
+    parent = array("q", range(len(offers.ids)))
+    buckets = conn.execute("SELECT band_hash, ordinal FROM dedup_band ORDER BY band_hash, ordinal")
+    for _, rows in groupby(buckets, key=lambda r: r[0]):
+        members: List[int] = []
+        for _, ordinal in rows:
+            for other in members[-MAX_BUCKET_COMPARISONS:]:
+                root, other_root = _find(parent, ordinal), _find(parent, other)
+                if root == other_root:
+                    break
+                if (
+                    offers.compatible(root, other_root, max_price_ratio)
+                    and offers.similarity(ordinal, other) >= threshold
+                ):
+                    offers.merge(parent, root, other_root)
+                    break
+            members.append(ordinal)
+    conn.execute("DROP TABLE dedup_band")
+
+    roots = [_find(parent, i) for i in range(len(offers.ids))]
+    sizes = Counter(roots)
+    assignments = [
+        (offers.ids[root] if sizes[root] > 1 else None, sizes[root], offers.ids[i]) for i, root in enumerate(roots)
+    ]
+    with conn:
+        for start in range(0, len(assignments), WRITE_CHUNK):
+            conn.executemany(
+                """
+                UPDATE parts SET cluster_id = ?1, cluster_size = ?2
+                WHERE id = ?3 AND (cluster_id IS NOT ?1 OR cluster_size != ?2)
+                """,
+                assignments[start:start + WRITE_CHUNK],
+            )
+        rebuild_price_stats(conn)
+        bump_meta(conn, DATA_GENERATION)
+    clusters = sum(1 for size in sizes.values() if size > 1)
+    clustered = sum(size for size in sizes.values() if size > 1)
+    return clusters, clustered
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Cluster duplicate offers in sonver.db")
+    parser.add_argument(
+        "--threshold", type=float, default=DEFAULT_THRESHOLD, help="minimum estimated Jaccard similarity"
+    )
+    parser.add_argument(
+        "--max-price-ratio",
+        type=float,
+        default=DEFAULT_MAX_PRICE_RATIO,
+        help="largest price ratio between two duplicates",
+    )
+    args = parser.parse_args(argv)
+
+    init_db()
+    conn = get_write_connection()
+    try:
+        clusters, clustered = cluster_offers(conn, args.threshold, args.max_price_ratio)
+    finally:
+        conn.close()
+    logger.info("Found %s duplicate clusters covering %s offers", clusters, clustered)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Expiry of listings that a complete crawl no longer returned.
+
+Every row a crawl writes is stamped with the crawl run's id as its
+``crawl_generation`` (rows of categories skipped as unchanged in an
+incremental crawl are stamped too, see
+:meth:`~sonver.crawl_state.CrawlState.leaf_unchanged`). Once a platform's
+run is complete, its rows with an older generation were not seen and are
+moved to ``parts_archive`` with set-based statements, keeping ``parts``
+and its indexes to live listings. The same transaction refreshes the
+price stats and best photos of the article keys and leaves they leave.
+"""
+
+import logging
+import sqlite3
+from datetime import datetime
+
+from .catalog import rebuild_catalog_tree
+from .images import refresh_best_photos
+from .meta import DATA_GENERATION, bump_meta
+from .price_stats import refresh_price_stats
+
+logger = logging.getLogger(__name__)
+
+_STALE = "platform = ? AND crawl_generation < ?"
+
+_ARCHIVE_COLUMNS = (
+    "id, platform, article, article_key, brand, model, generation, category, description, "
+    "price, currency, location, url, image_url, last_seen, crawl_generation, cluster_id"
+)
+
+
+def archive_unseen(conn: sqlite3.Connection, platform: str, generation: int) -> int:
+    """Archive ``platform`` rows not stamped by crawl ``generation``. Returns the row count.
+
+    Only call this for a run whose failed requests, if any, were all tied
+    to leaves whose stored rows it stamped as seen.
+    Nothing is archived when the crawl wrote no rows at all, so a crawl
+    that was blocked or returned an empty catalog cannot wipe the table.
+    """
+
+    params = (platform, generation)
+    with conn:
+        seen = conn.execute(
+            "SELECT EXISTS (SELECT 1 FROM parts WHERE platform = ? AND crawl_generation = ?)", params
+        ).fetchone()[0]
+        if not seen:
+            if conn.execute(f"SELECT EXISTS (SELECT 1 FROM parts WHERE {_STALE})", params).fetchone()[0]:
+                logger.warning("%s crawl %s wrote no rows; skipping expiry", platform, generation)
+            return 0
+
+        article_keys = [r[0] for r in conn.execute(f"SELECT DISTINCT article_key FROM parts WHERE {_STALE}", params)]
+        categories = [
+            tuple(r)
+            for r in conn.execute(
+                f"SELECT DISTINCT brand, model, generation, category FROM parts WHERE {_STALE}", params
+            )
+        ]
+        conn.execute(
+            f"""
+            INSERT OR REPLACE INTO parts_archive ({_ARCHIVE_COLUMNS}, archived_at)
+            SELECT {_ARCHIVE_COLUMNS}, ? FROM parts WHERE {_STALE}
+            """,
+            (datetime.utcnow().isoformat(), *params),
+        )
+        archived = conn.execute(f"DELETE FROM parts WHERE {_STALE}", params).rowcount
+        if not archived:
+            return 0
+
+        refresh_price_stats(conn, article_keys=article_keys, categories=categories)
+        refresh_best_photos(conn, article_keys=article_keys, categories=categories)
+        emptied = any(
+            conn.execute(
+                """
+                SELECT NOT EXISTS (
+                    SELECT 1 FROM parts WHERE brand = ? AND model = ? AND generation = ? AND category = ?
+                )
+                """,
+                category,
+            ).fetchone()[0]
+            for category in categories
+        )
+        if emptied:
+            rebuild_catalog_tree(conn)
+        bump_meta(conn, DATA_GENERATION)
+    logger.info("Archived %s %s listings not seen by crawl %s", archived, platform, generation)
+    return archived
@@ -0,0 +1,333 @@
+"""Image dimension probing and best-photo selection.
+
+Replaces the browser pass of ``scrape_rrr.js``, which rendered every
+result page to read ``naturalWidth``/``naturalHeight``. Here each distinct
+``image_url`` is fetched with a ranged, streamed GET that stops as soon as
+the header bytes name the format and dimensions (PNG, GIF, JPEG, WebP,
+BMP); usually that is the first few kilobytes. Requests run on a bounded
+thread pool and are paced per host by a
+:class:`~sonver.scrapers.throttle.Throttle`.
+
+Results are cached by URL in ``image_meta``, so only new URLs are probed
+(and failed ones again with ``--retry-failed``). ``best_photo`` then holds
+the largest probed photo per article key and per catalog leaf, keyed like
+``price_stats``; as in the browser pass, larger area wins.
+"""
+
+import argparse
+import logging
+import sqlite3
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .db import get_write_connection, init_db
+from .meta import DATA_GENERATION, bump_meta
+from .price_stats import CategoryKey
+from .scrapers.throttle import RETRY_STATUSES, Throttle, parse_retry_after
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# (url, format, width, height, status, probed_at) as stored in image_meta.
+ImageMeta = Tuple[str, Optional[str], Optional[int], Optional[int], str, str]
+Size = Tuple[str, int, int]
+
+MAX_PROBE_BYTES = 64 * 1024
+PROBE_CHUNK = 4096
+DEFAULT_WORKERS = 8
+
+_JPEG_SOF = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def sniff_format(header: bytes) -> Optional[str]:
+    """Image format named by the first 12 bytes of ``header``, if any."""
+
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if header.startswith((b"GIF87a", b"GIF89a")):
+        return "gif"
+    if header.startswith(b"\xff\xd8"):
+        return "jpeg"
+    if header.startswith(b"RIFF") and header[8:12] == b"WEBP":
+        return "webp"
+    if header.startswith(b"BM"):
+        return "bmp"
+    return None
+
+
+def _jpeg_size(header: bytes) -> Optional[Tuple[int, int]]:
+    pos = 2
+    while pos + 4 <= len(header):
+        if header[pos] != 0xFF:
+            return None
+        marker = header[pos + 1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:  # segments without a length
+            pos += 2
+            continue
+        if marker in _JPEG_SOF:
+            if pos + 9 > len(header):
+                return None
+            height, width = struct.unpack(">HH", header[pos + 5:pos + 9])
+            return width, height
+        pos += 2 + struct.unpack(">H", header[pos + 2:pos + 4])[0]
+    return None
+
+
+def _webp_size(header: bytes) -> Optional[Tuple[int, int]]:
+    chunk = header[12:16]
+    if chunk == b"VP8 " and len(header) >= 30 and header[23:26] == b"\x9d\x01\x2a":
+        width, height = struct.unpack("<HH", header[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and len(header) >= 25 and header[20] == 0x2F:
+        bits = int.from_bytes(header[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X" and len(header) >= 30:
+        return int.from_bytes(header[24:27], "little") + 1, int.from_bytes(header[27:30], "little") + 1
+    return None
+
+
+def image_size(header: bytes) -> Optional[Size]:
+    """``(format, width, height)`` from the leading bytes of an image.
+
+    Returns None when the format is unknown or ``header`` is too short to
+    reach the dimensions; for JPEG that can take several kilobytes when
+    EXIF data precedes the frame header.
+    """
+
+    fmt = sniff_format(header)
+    size: Optional[Tuple[int, int]] = None
+    if fmt == "png" and len(header) >= 24 and header[12:16] == b"IHDR":
+        size = struct.unpack(">II", header[16:24])
+    elif fmt == "gif" and len(header) >= 10:
+        size = struct.unpack("<HH", header[6:10])
+    elif fmt == "jpeg":
+        size = _jpeg_size(header)
+    elif fmt == "webp":
+        size = _webp_size(header)
+    elif fmt == "bmp" and len(header) >= 26:
+        width, height = struct.unpack("<ii", header[18:26])
+        size = width, abs(height)
+    if fmt is None or size is None:
+        return None
+    return fmt, size[0], size[1]
+
+
+class ImageProber:
+    """Reads image dimensions from as few leading bytes as possible."""
+
+    def __init__(
+        self,
+        session: Optional[requests.Session] = None,
+        workers: int = DEFAULT_WORKERS,
+        max_bytes: int = MAX_PROBE_BYTES,
+        throttle: Optional[Throttle] = None,
+    ) -> None:
+        self.workers = max(1, workers)
+        self.max_bytes = max_bytes
+        self.throttle = throttle or Throttle("images")
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def probe(self, url: str) -> ImageMeta:
+        now = datetime.utcnow().isoformat()
+        if not url.startswith(("http://", "https://")):
+            return url, None, None, None, "skipped", now
+        host = self.throttle.host(url)
+        start_at = host.schedule()
+        if start_at is None:
+            return url, None, None, None, "error", now
+        wait = start_at - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        started = time.perf_counter()
+        header = b""
+        try:
+            response = self.session.get(
+                url, headers={"Range": f"bytes=0-{self.max_bytes - 1}"}, stream=True, timeout=host.timeout
+            )
+            try:
+                if not response.ok:
+                    if response.status_code in RETRY_STATUSES:
+                        host.failure(parse_retry_after(response.headers.get("Retry-After")))
+                    else:
+                        host.success(time.perf_counter() - started)
+                    logger.debug("Image probe %s failed: HTTP %s", url, response.status_code)
+                    return url, None, None, None, "error", now
+                # Servers that ignore Range send the whole file; closing the
+                # streamed response after the header drops the rest.
+                for chunk in response.iter_content(PROBE_CHUNK):
+                    header += chunk
+                    size = image_size(header)
+                    if size is not None:
+                        host.success(time.perf_counter() - started)
+                        return (url, *size, "ok", now)
+                    if len(header) >= self.max_bytes or (len(header) >= 12 and sniff_format(header) is None):
+                        break
+            finally:
+                response.close()
+        except requests.RequestException as exc:  # pragma: no cover - network errors
+            host.failure()
+            logger.debug("Image probe %s failed: %s", url, exc)
+            return url, None, None, None, "error", now
+        host.success(time.perf_counter() - started)
+        return url, sniff_format(header), None, None, "unknown", now
+
+    def probe_all(self, urls: List[str]) -> List[ImageMeta]:
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="image-probe") as pool:
+            return list(pool.map(self.probe, urls))
+
+
+def pending_urls(conn: sqlite3.Connection, retry_failed: bool = False, limit: Optional[int] = None) -> List[str]:
+    """Distinct ``image_url`` s with no cached probe (or only a failed one)."""
+
+    sql = """
+        SELECT DISTINCT image_url FROM parts
+        WHERE image_url != '' AND image_url NOT IN (SELECT url FROM image_meta {})
+    """.format("WHERE status = 'ok'" if retry_failed else "")
+    params: Tuple[int, ...] = ()
+    if limit is not None:
+        sql += " LIMIT ?"
+        params = (limit,)
+    return [r[0] for r in conn.execute(sql, params)]
+
+
+def store_probes(conn: sqlite3.Connection, rows: List[ImageMeta]) -> None:
+    with conn:
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO image_meta (url, format, width, height, status, probed_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+
+
+def rebuild_best_photos(conn: sqlite3.Connection) -> None:
+    """Recompute ``best_photo``: the largest probed image per article key and per leaf."""
+
+    ranked = """
+        INSERT INTO best_photo (article_key, brand, model, generation, category, image_url, width, height)
+        SELECT article_key, brand, model, generation, category, image_url, width, height FROM (
+            SELECT {key}, p.image_url, m.width, m.height,
+                   ROW_NUMBER() OVER (PARTITION BY {partition} ORDER BY m.width * m.height DESC, p.id) AS rank
+            FROM parts AS p JOIN image_meta AS m ON m.url = p.image_url
+            WHERE m.status = 'ok' {where}
+        )
+        WHERE rank = 1
+    """
+    with conn:
+        conn.execute("DELETE FROM best_photo")
+        conn.execute(
+            ranked.format(
+                key="p.article_key, '' AS brand, '' AS model, '' AS generation, '' AS category",
+                partition="p.article_key",
+                where="AND p.article_key != ''",
+            )
+        )
+        conn.execute(
+            ranked.format(
+                key="'' AS article_key, COALESCE(p.brand, '') AS brand, COALESCE(p.model, '') AS model, "
+                "COALESCE(p.generation, '') AS generation, COALESCE(p.category, '') AS category",
+                partition="p.brand, p.model, p.generation, p.category",
+                where="",
+            )
+        )
+        bump_meta(conn, DATA_GENERATION)
+
+
+def refresh_best_photos(
+    conn: sqlite3.Connection,
+    article_keys: Iterable[str] = (),
+    categories: Iterable[CategoryKey] = (),
+) -> None:
+    """Recompute the ``best_photo`` rows of the given article keys and leaves; the caller owns the transaction."""
+
+    largest = """
+        INSERT INTO best_photo (article_key, brand, model, generation, category, image_url, width, height)
+        SELECT {key}, p.image_url, m.width, m.height
+        FROM parts AS p JOIN image_meta AS m ON m.url = p.image_url
+        WHERE m.status = 'ok' AND {where}
+        ORDER BY m.width * m.height DESC, p.id
+        LIMIT 1
+    """
+    for article_key in article_keys:
+        if not article_key:
+            continue
+        conn.execute("DELETE FROM best_photo WHERE article_key = ? AND brand = ''", (article_key,))
+        conn.execute(
+            largest.format(key="p.article_key, '', '', '', ''", where="p.article_key = ?"),
+            (article_key,),
+        )
+    for category in categories:
+        conn.execute(
+            """
+            DELETE FROM best_photo
+            WHERE article_key = '' AND brand = ? AND model = ? AND generation = ? AND category = ?
+            """,
+            category,
+        )
+        conn.execute(
+            largest.format(
+                key="'', ?1, ?2, ?3, ?4",
+                where="p.brand = ?1 AND p.model = ?2 AND p.generation = ?3 AND p.category = ?4",
+            ),
+            category,
+        )
+
+
+def probe_images(
+    conn: sqlite3.Connection,
+    prober: ImageProber,
+    retry_failed: bool = False,
+    limit: Optional[int] = None,
+    batch_size: int = 500,
+) -> Tuple[int, int]:
+    """Probe uncached image URLs and refresh ``best_photo``. Returns ``(probed, sized)``."""
+
+    urls = pending_urls(conn, retry_failed=retry_failed, limit=limit)
+    probed = sized = 0
+    for start in range(0, len(urls), batch_size):
+        rows = prober.probe_all(urls[start:start + batch_size])
+        store_probes(conn, rows)
+        probed += len(rows)
+        sized += sum(1 for row in rows if row[4] == "ok")
+        logger.info("Probed %s/%s images", probed, len(urls))
+    rebuild_best_photos(conn)
+    return probed, sized
+
+
+def probe_new_images(workers: int = DEFAULT_WORKERS, retry_failed: bool = False, limit: Optional[int] = None) -> None:
+    """Run :func:`probe_images` on its own write connection, e.g. after a crawl."""
+
+    conn = get_write_connection()
+    try:
+        probed, sized = probe_images(conn, ImageProber(workers=workers), retry_failed, limit)
+    finally:
+        conn.close()
+    logger.info("Probed %s images, %s with known dimensions", probed, sized)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Probe listing image sizes and pick the best photos")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="concurrent probe requests")
+    parser.add_argument("--retry-failed", action="store_true", help="probe URLs whose earlier probe failed again")
+    parser.add_argument("--limit", type=int, help="probe at most this many URLs")
+    args = parser.parse_args(argv)
+
+    init_db()
+    probe_new_images(args.workers, args.retry_failed, args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Import the ``rrr_full_export.json`` written by ``scrape_rrr.js``.
+
+The export is one JSON array with an entry per brand/model/category, each
+carrying its ``items`` and the category's ``median_price``,
+``average_price``, ``sonver_price`` and ``cleanest_photo``. The array is
+decoded one entry at a time from a rolling buffer, so memory is bounded by
+the largest category rather than by the export. Items are upserted as
+platform RRR through :class:`~sonver.db.PartWriter`; the aggregates are
+kept in ``category_summary``.
+"""
+
+import argparse
+import json
+import logging
+import sqlite3
+from datetime import datetime
+from statistics import median
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from .db import PartWriter, init_db
+from .normalize import normalize_batch
+from .price_stats import sonver_price
+from .record import PartRecord
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PLATFORM = "RRR"
+SOURCE = "rrr_export"
+
+_WHITESPACE = " \t\r\n"
+
+
+def iter_json_array(fp: TextIO, chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """Yield the elements of the top-level JSON array in ``fp`` one at a time."""
+
+    decoder = json.JSONDecoder()
+    buf = fp.read(chunk_size)
+    eof = not buf
+    pos = 0
+
+    def skip(chars: str) -> None:
+        nonlocal pos
+        while pos < len(buf) and buf[pos] in chars:
+            pos += 1
+
+    skip(_WHITESPACE)
+    if buf[pos:pos + 1] != "[":
+        raise ValueError("export is not a JSON array")
+    pos += 1
+    while True:
+        skip(_WHITESPACE + ",")
+        if pos < len(buf) and buf[pos] == "]":
+            return
+        if pos < len(buf):
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                # A value touching the end of the buffer may be a truncated
+                # scalar; only trust it once more input has been read.
+                if end < len(buf) or eof:
+                    yield value
+                    pos = end
+                    continue
+        elif eof:
+            raise ValueError("export ended before the closing bracket")
+        # Grow reads with the pending value so a huge entry is not
+        # re-decoded once per chunk.
+        chunk = fp.read(max(chunk_size, len(buf) - pos))
+        eof = not chunk
+        buf = buf[pos:] + chunk
+        pos = 0
+
+
+def export_items(entry: Dict[str, Any]) -> List[PartRecord]:
+    """Flatten one export entry into normalized RRR records."""
+
+    records = []
+    for raw in entry.get("items") or ():
+        record = PartRecord.from_dict(raw)
+        record.platform = PLATFORM
+        record.brand = record.brand or entry.get("brand") or ""
+        record.model = record.model or entry.get("model") or ""
+        record.generation = record.generation or entry.get("generation") or ""
+        record.category = record.category or entry.get("category") or ""
+        records.append(record)
+    return normalize_batch(records)
+
+
+def export_summary(entry: Dict[str, Any], items: List[PartRecord], now: str) -> Tuple[Any, ...]:
+    """``category_summary`` row for ``entry``; missing aggregates are derived from ``items``."""
+
+    prices = [item.price for item in items]
+    median_price = entry.get("median_price")
+    if median_price is None:
+        median_price = median(prices) if prices else 0.0
+    average_price = entry.get("average_price")
+    if average_price is None:
+        average_price = sum(prices) / len(prices) if prices else 0.0
+    markup_price = entry.get("sonver_price")
+    if markup_price is None:
+        markup_price = sonver_price(median_price)
+    photo = entry.get("cleanest_photo")
+    if photo is None:
+        photo = next((item.image_url for item in items if item.image_url), "")
+    return (
+        SOURCE,
+        (entry.get("brand") or "").strip(),
+        (entry.get("model") or "").strip(),
+        (entry.get("generation") or "").strip(),
+        (entry.get("category") or "").strip(),
+        len(items),
+        median_price,
+        average_price,
+        markup_price,
+        photo,
+        now,
+    )
+
+
+def _store_summaries(conn: sqlite3.Connection, rows: List[Tuple[Any, ...]]) -> None:
+    with conn:
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO category_summary (
+                source, brand, model, generation, category, item_count,
+                median_price, average_price, sonver_price, cleanest_photo, updated_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+
+
+def import_export(fp: TextIO, batch_size: int = 500) -> Tuple[int, int, int]:
+    """Import an export stream. Returns ``(categories, inserted, updated)``."""
+
+    categories = 0
+    summaries: List[Tuple[Any, ...]] = []
+    with PartWriter(batch_size=batch_size) as writer:
+        for entry in iter_json_array(fp):
+            if not isinstance(entry, dict):
+                continue
+            items = export_items(entry)
+            writer.extend(items)
+            summaries.append(export_summary(entry, items, datetime.utcnow().isoformat()))
+            categories += 1
+            if len(summaries) >= batch_size:
+                _store_summaries(writer.conn, summaries)
+                summaries = []
+        writer.flush()
+        if summaries:
+            _store_summaries(writer.conn, summaries)
+    return categories, writer.inserted, writer.updated
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Import rrr_full_export.json into sonver.db")
+    parser.add_argument("export", nargs="?", default="rrr_full_export.json", help="path to the export")
+    parser.add_argument("--batch-size", type=int, default=500, help="items per transaction")
+    args = parser.parse_args(argv)
+
+    init_db()
+    with open(args.export, encoding="utf-8") as fp:
+        categories, inserted, updated = import_export(fp, batch_size=args.batch_size)
+    logger.info("Imported %s categories: inserted %s items, updated %s items", categories, inserted, updated)
+
+
+if __name__ == "__main__":
+    main()
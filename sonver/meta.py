@@ -0,0 +1,22 @@
+"""Small integer counters stored in the ``meta`` table."""
+
+import sqlite3
+
+TREE_VERSION = "tree_version"
+# Bumped by every committed write to parts and its derived tables.
+DATA_GENERATION = "data_generation"
+
+
+def get_meta(conn: sqlite3.Connection, key: str, default: int = 0) -> int:
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else default
+
+
+def bump_meta(conn: sqlite3.Connection, key: str) -> None:
+    conn.execute(
+        """
+        INSERT INTO meta (key, value) VALUES (?, 1)
+        ON CONFLICT(key) DO UPDATE SET value = value + 1
+        """,
+        (key,),
+    )
@@ -0,0 +1,232 @@
+"""Lightweight in-process metrics with Prometheus text exposition.
+
+Counters and histograms are keyed by label values and guarded by a lock
+each. Set ``SONVER_METRICS=0`` to disable collection; every recording call
+then returns after a single attribute check.
+"""
+
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+Labels = Tuple[Tuple[str, str], ...]
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Registry:
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self._metrics: Dict[str, "Metric"] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: "Metric") -> "Metric":
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str) -> "Counter":
+        return self._register(Counter(self, name, help))  # type: ignore[return-value]
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS) -> "Histogram":
+        return self._register(Histogram(self, name, help, buckets))  # type: ignore[return-value]
+
+    def gauge_callback(self, name: str, help: str, fn: Callable[[], Dict[Labels, float]]) -> None:
+        """Expose values computed by ``fn`` at scrape time."""
+
+        self._register(CallbackGauge(self, name, help, fn))
+
+    def render(self) -> str:
+        """Return all metrics in Prometheus text exposition format (0.0.4)."""
+
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()
+
+
+class Metric:
+    type = "untyped"
+
+    def __init__(self, registry: Registry, name: str, help: str) -> None:
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def reset(self) -> None:
+        pass
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, registry: Registry, name: str, help: str) -> None:
+        super().__init__(registry, name, help)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        if not self.registry.enabled:
+            return
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def values(self) -> Dict[Labels, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def total(self, **match: str) -> float:
+        """Sum over all label sets that include the ``match`` labels."""
+
+        wanted = set(_labels(match))
+        return sum(v for k, v in self.values().items() if wanted <= set(k))
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(k)} {_format_value(v)}" for k, v in sorted(self.values().items())]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, registry: Registry, name: str, help: str, buckets: Sequence[float]) -> None:
+        super().__init__(registry, name, help)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        if not self.registry.enabled:
+            return
+        key = _labels(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            else:
+                state[len(self.buckets)] += 1
+            state[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        if not self.registry.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def total(self, **match: str) -> Tuple[float, float]:
+        """Return ``(count, sum)`` over all label sets that include the ``match`` labels."""
+
+        wanted = set(_labels(match))
+        count = total = 0.0
+        with self._lock:
+            for key, state in self._values.items():
+                if wanted <= set(key):
+                    count += sum(state[:-1])
+                    total += state[-1]
+        return count, total
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = {k: list(v) for k, v in self._values.items()}
+        lines: List[str] = []
+        for key, state in sorted(values.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                le = _format_labels(key, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{le} {_format_value(cumulative)}")
+            cumulative += state[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {_format_value(cumulative)}")
+        return lines
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class CallbackGauge(Metric):
+    type = "gauge"
+
+    def __init__(self, registry: Registry, name: str, help: str, fn: Callable[[], Dict[Labels, float]]) -> None:
+        super().__init__(registry, name, help)
+        self.fn = fn
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(k)} {_format_value(v)}" for k, v in sorted(self.fn().items())]
+
+
+REGISTRY = Registry(enabled=os.environ.get("SONVER_METRICS", "1") != "0")
+
+# Scraper side
+SCRAPER_REQUEST_SECONDS = REGISTRY.histogram(
+    "sonver_scraper_request_seconds", "HTTP request latency per platform and outcome"
+)
+SCRAPER_RETRIES = REGISTRY.counter("sonver_scraper_retries_total", "Failed HTTP attempts that were retried or abandoned")
+SCRAPER_RESPONSE_BYTES = REGISTRY.counter("sonver_scraper_response_bytes_total", "Response body bytes downloaded")
+SCRAPER_THROTTLE_EVENTS = REGISTRY.counter(
+    "sonver_scraper_throttle_events_total", "Rate decreases, Retry-After waits and circuit breaker decisions per host"
+)
+SCRAPER_CACHE_HITS = REGISTRY.counter("sonver_scraper_cache_hits_total", "Responses served from the response cache")
+SCRAPER_PARSE_SECONDS = REGISTRY.histogram("sonver_scraper_parse_seconds", "Time spent parsing result pages")
+SCRAPER_ITEMS = REGISTRY.counter("sonver_scraper_items_total", "Items produced by scrapers")
+
+# API side
+API_REQUEST_SECONDS = REGISTRY.histogram("sonver_api_request_seconds", "API request latency per route and status")
+API_SQL_SECONDS = REGISTRY.histogram("sonver_api_sql_seconds", "Time spent in database work per query function")
@@ -1,22 +1,75 @@
 from datetime import datetime
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, Iterator, List, Union
 
+from .record import PartRecord
 
-def normalize_item(raw_item: Dict[str, Any]) -> Dict[str, Any]:
+# Characters dropped when building the canonical article key: the same part
+# number is listed as "1K0 615 301-AA", "1k0.615.301aa" and so on.
+_ARTICLE_KEY_STRIP = str.maketrans("", "", " \t\r\n\xa0-.")
+
+RawItem = Union[PartRecord, Dict[str, Any]]
+
+
+def normalize_article(article: Any) -> str:
+    """Return the canonical lookup key for a part number."""
+
+    return str(article or "").translate(_ARTICLE_KEY_STRIP).lower()
+
+
+def normalize_batch(items: Iterable[RawItem]) -> List[PartRecord]:
+    """Normalize raw scraped items into :class:`PartRecord` s.
+
+    Records are normalized in place and dicts are converted; the whole
+    batch shares one ``last_seen`` timestamp.
+    """
+
+    now = datetime.utcnow().isoformat()
+    records: List[PartRecord] = []
+    for item in items:
+        record = item if isinstance(item, PartRecord) else PartRecord.from_dict(item)
+        article = str(record.article or "").strip()
+        record.article = article
+        record.article_key = article.translate(_ARTICLE_KEY_STRIP).lower()
+        record.platform = record.platform or "unknown"
+        record.brand = (record.brand or "").strip()
+        record.model = (record.model or "").strip()
+        record.generation = (record.generation or "").strip()
+        record.category = (record.category or "").strip()
+        record.description = (record.description or "").strip()
+        record.price = float(record.price or 0.0)
+        record.location = (record.location or "").strip()
+        record.url = record.url or ""
+        record.image_url = record.image_url or ""
+        record.last_seen = now
+        records.append(record)
+    return records
+
+
+def normalize_batches(items: Iterable[RawItem], size: int) -> Iterator[List[PartRecord]]:
+    """Draw ``items`` ``size`` at a time and yield each chunk normalized.
+
+    If ``items`` raises, the items drawn so far are still yielded before
+    the exception propagates, so nothing that was consumed is lost.
+    """
+
+    iterator = iter(items)
+    while True:
+        chunk: List[RawItem] = []
+        try:
+            for item in iterator:
+                chunk.append(item)
+                if len(chunk) >= size:
+                    break
+        except Exception:
+            if chunk:
+                yield normalize_batch(chunk)
+            raise
+        if not chunk:
+            return
+        yield normalize_batch(chunk)
+
+
+def normalize_item(raw_item: RawItem) -> PartRecord:
     """Normalize raw scraped data into a consistent structure."""
 
-    return {
-        "platform": raw_item.get("platform", "unknown"),
-        "article": str(raw_item.get("article", "")).strip(),
-        "brand": (raw_item.get("brand") or "").strip(),
-        "model": (raw_item.get("model") or "").strip(),
-        "generation": (raw_item.get("generation") or "").strip(),
-        "category": (raw_item.get("category") or "").strip(),
-        "description": (raw_item.get("description") or "").strip(),
-        "price": float(raw_item.get("price") or 0.0),
-        "currency": raw_item.get("currency", "EUR"),
-        "location": (raw_item.get("location") or "").strip(),
-        "url": raw_item.get("url", ""),
-        "image_url": raw_item.get("image_url", ""),
-        "last_seen": datetime.utcnow().isoformat(),
-    }
+    return normalize_batch((raw_item,))[0]
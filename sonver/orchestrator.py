@@ -0,0 +1,302 @@
+"""Parallel crawl orchestration with a single writer.
+
+Each platform scraper, and optionally each brand shard of RRR, runs as a
+task in a pool of worker processes. Workers normalize items and send them
+in batches over a bounded queue to the orchestrating process, which is the
+only one writing to sonver.db: every batch is upserted through one
+:class:`~sonver.db.PartWriter` together with the crawl progress it covers.
+
+Crawl runs are begun and finished by the writer, which hands each task a
+snapshot of its platform's checkpoint; workers never open the database.
+A platform's run is marked complete, and its unseen listings archived,
+once all of its tasks have finished without failed requests. Otherwise the
+run stays open and a failed shard is resumed by the next crawl, until the
+run's final attempt finishes it as ``partial`` (see
+:func:`~sonver.run_scraper.close_run`). Rows a task did not reach are never
+expired.
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from . import metrics
+from .crawl_state import CrawlState, LeafState
+from .db import PartWriter, init_db
+from .images import probe_new_images
+from .normalize import normalize_batches
+from .run_scraper import close_run, crawl_summary
+from .scrapers import AutopliusScraper, BaseScraper, MLAutoScraper, MobileDeScraper, RRRScraper, ResponseCache
+from .snapshot import publish_snapshot
+
+logger = logging.getLogger(__name__)
+
+SCRAPERS: Dict[str, Type[BaseScraper]] = {
+    cls.platform: cls for cls in (RRRScraper, MLAutoScraper, AutopliusScraper, MobileDeScraper)
+}
+
+# Platforms whose scraper accepts ``shard=(index, count)``.
+SHARDABLE = frozenset({RRRScraper.platform})
+# Platforms whose scraper accepts ``workers`` for concurrent fetching.
+CONCURRENT = frozenset({RRRScraper.platform})
+
+
+@dataclass(frozen=True)
+class CrawlTask:
+    platform: str
+    shard: Optional[Tuple[int, int]] = None
+
+    @property
+    def name(self) -> str:
+        if self.shard is None:
+            return self.platform
+        return f"{self.platform}[{self.shard[0]}/{self.shard[1]}]"
+
+
+@dataclass(frozen=True)
+class CrawlOptions:
+    batch_size: int = 500
+    incremental: bool = False
+    cache_dir: Optional[str] = None
+    cache_mode: str = "readwrite"
+    expire: bool = True
+    fetch_workers: int = 1
+    max_per_host: Optional[int] = None
+
+
+def plan_tasks(platforms: List[str], shards: int = 1) -> List[CrawlTask]:
+    """Split ``platforms`` into tasks, sharding the ones that support it."""
+
+    tasks: List[CrawlTask] = []
+    for platform in platforms:
+        if platform in SHARDABLE and shards > 1:
+            tasks.extend(CrawlTask(platform, (index, shards)) for index in range(shards))
+        else:
+            tasks.append(CrawlTask(platform))
+    return tasks
+
+
+# -----------------------
+# Worker side
+# -----------------------
+def crawl_task(task: CrawlTask, leaves: Dict[str, LeafState], options: CrawlOptions, results: Any) -> None:
+    """Crawl one task from checkpoint ``leaves``, sending ``("items", name, items, progress)`` batches."""
+
+    # A worker process may run several tasks; summaries are per task.
+    metrics.REGISTRY.reset()
+    cache = ResponseCache(options.cache_dir, mode=options.cache_mode) if options.cache_dir else None
+    kwargs: Dict[str, Any] = {"cache": cache}
+    if task.shard is not None:
+        kwargs["shard"] = task.shard
+    if task.platform in CONCURRENT:
+        kwargs["workers"] = options.fetch_workers
+    if options.max_per_host is not None:
+        kwargs["max_per_host"] = options.max_per_host
+    scraper = SCRAPERS[task.platform](**kwargs)
+
+    # Workers never open sonver.db; the checkpoint comes from the writer.
+    state = CrawlState(None, task.platform, incremental=options.incremental)
+    state.load(leaves)
+    scraper.state = state
+
+    started = time.perf_counter()
+    count = 0
+    batches = normalize_batches(scraper.iter_items(), options.batch_size)
+    try:
+        # Progress is only recorded once a page is fully consumed, so it
+        # never covers items that are not in this or earlier batches.
+        for batch in batches:
+            count += len(batch)
+            results.put(("items", task.name, batch, state.take_progress()))
+    except Exception as exc:
+        logger.exception("Crawl task %s failed", task.name)
+        results.put(("items", task.name, [], state.take_progress()))
+        results.put(("failed", task.name, repr(exc)))
+        return
+    results.put(("items", task.name, [], state.take_progress()))
+    summary = crawl_summary(task.platform, count, time.perf_counter() - started, scraper.failed_requests)
+    summary["platform"] = task.name
+    summary["unrecorded_failures"] = scraper.unrecorded_failures()
+    results.put(("done", task.name, summary))
+
+
+def _worker(tasks: Any, results: Any, options: CrawlOptions) -> None:
+    while True:
+        work = tasks.get()
+        if work is None:
+            return
+        crawl_task(*work, options, results)
+
+
+# -----------------------
+# Writer side
+# -----------------------
+def orchestrate(
+    platforms: Optional[List[str]] = None,
+    shards: int = 1,
+    workers: Optional[int] = None,
+    resume: bool = True,
+    options: CrawlOptions = CrawlOptions(),
+) -> List[str]:
+    """Run the crawl in worker processes and ingest it here.
+
+    Returns the names of tasks that failed or had failed requests; their
+    platforms' runs stay open and are resumed by the next crawl, unless
+    this was the run's final attempt.
+    """
+
+    tasks = plan_tasks(platforms or list(SCRAPERS), shards)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tasks)))
+    by_name = {task.name: task for task in tasks}
+    outstanding = {platform: 0 for platform in dict.fromkeys(task.platform for task in tasks)}
+    for task in tasks:
+        outstanding[task.platform] += 1
+    # Failed requests per platform, and those no checkpoint records.
+    failures = dict.fromkeys(outstanding, 0)
+    unrecorded = dict.fromkeys(outstanding, 0)
+
+    # spawn keeps workers free of the writer's sqlite handles and threads.
+    ctx = multiprocessing.get_context("spawn")
+    task_queue = ctx.Queue()
+    results = ctx.Queue(maxsize=workers * 2)
+    summaries: List[Dict[str, Any]] = []
+    failed: List[str] = []
+    pending = set(by_name)
+    with PartWriter(batch_size=options.batch_size) as writer:
+        states: Dict[str, CrawlState] = {}
+        for platform in outstanding:
+            states[platform] = CrawlState(writer.conn, platform, incremental=options.incremental)
+            states[platform].begin(resume=resume)
+        for task in tasks:
+            task_queue.put((task, states[task.platform].progress()))
+        for _ in range(workers):
+            task_queue.put(None)
+
+        logger.info("Crawling %s tasks in %s worker processes", len(tasks), workers)
+        processes = [ctx.Process(target=_worker, args=(task_queue, results, options)) for _ in range(workers)]
+        for process in processes:
+            process.start()
+
+        while pending:
+            try:
+                message = results.get(timeout=1)
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes):
+                    # Workers died without reporting, e.g. killed by the OS;
+                    # what they did not reach is unknown, so nothing expires.
+                    for name in sorted(pending):
+                        logger.error("Crawl task %s exited without finishing", name)
+                        platform = by_name[name].platform
+                        failures[platform] += 1
+                        unrecorded[platform] += 1
+                        outstanding[platform] -= 1
+                        if outstanding[platform] == 0:
+                            close_run(writer.conn, states[platform], failures[platform], unrecorded[platform], False)
+                    failed.extend(sorted(pending))
+                    break
+                continue
+
+            kind, name = message[0], message[1]
+            platform = by_name[name].platform
+            if kind == "items":
+                items, progress = message[2], message[3]
+                state = states[platform]
+                writer.checkpoint = state
+                writer.extend(items)
+                state.merge(progress)
+                writer.flush()
+                continue
+
+            pending.discard(name)
+            if kind == "failed":
+                # The task stopped early; the leaves it did not reach are unknown.
+                logger.error("Crawl task %s failed: %s", name, message[2])
+                failed.append(name)
+                failures[platform] += 1
+                unrecorded[platform] += 1
+            else:
+                summary = message[2]
+                summaries.append(summary)
+                logger.info("%s returned %s items", name, summary["items"])
+                if summary["failed_requests"]:
+                    logger.error("Crawl task %s had %s failed requests", name, summary["failed_requests"])
+                    failed.append(name)
+                failures[platform] += summary["failed_requests"]
+                unrecorded[platform] += summary["unrecorded_failures"]
+            outstanding[platform] -= 1
+            if outstanding[platform] == 0:
+                close_run(writer.conn, states[platform], failures[platform], unrecorded[platform], options.expire)
+
+        writer.checkpoint = None
+
+    for process in processes:
+        process.join()
+    logger.info("Inserted %s items, updated %s items", writer.inserted, writer.updated)
+    for summary in summaries:
+        logger.info("Crawl summary: %s", summary)
+    return failed
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Crawl platforms in parallel worker processes into sonver.db")
+    parser.add_argument(
+        "--platforms", nargs="+", choices=sorted(SCRAPERS), default=list(SCRAPERS), help="platforms to crawl"
+    )
+    parser.add_argument("--shards", type=int, default=1, help="split RRR into this many brand shards")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument(
+        "--fetch-workers", type=int, default=1, help="concurrent requests per RRR task (default: sequential)"
+    )
+    parser.add_argument(
+        "--max-per-host", type=int, help="requests in flight per host in each task (default: --fetch-workers)"
+    )
+    parser.add_argument("--batch-size", type=int, default=500, help="items per queued batch and transaction")
+    parser.add_argument("--restart", action="store_true", help="ignore checkpoints of an interrupted crawl")
+    parser.add_argument(
+        "--incremental", action="store_true", help="shallow-scan categories whose first page is unchanged"
+    )
+    parser.add_argument(
+        "--keep-unseen", action="store_true", help="do not archive listings the crawl no longer returned"
+    )
+    parser.add_argument(
+        "--probe-images", action="store_true", help="probe new image URLs and refresh the best photos afterwards"
+    )
+    parser.add_argument(
+        "--no-snapshot", action="store_true", help="do not publish a read snapshot for search_api afterwards"
+    )
+    parser.add_argument("--cache-dir", help="cache HTTP responses in this directory")
+    parser.add_argument(
+        "--cache-mode",
+        choices=("readwrite", "record", "replay"),
+        default="readwrite",
+        help="replay serves a recorded crawl without touching the network",
+    )
+    args = parser.parse_args(argv)
+
+    init_db()
+    options = CrawlOptions(
+        batch_size=args.batch_size,
+        incremental=args.incremental,
+        cache_dir=args.cache_dir,
+        cache_mode=args.cache_mode,
+        expire=not args.keep_unseen,
+        fetch_workers=args.fetch_workers,
+        max_per_host=args.max_per_host,
+    )
+    failed = orchestrate(args.platforms, args.shards, args.workers, resume=not args.restart, options=options)
+    if args.probe_images:
+        probe_new_images()
+    if not args.no_snapshot:
+        publish_snapshot()
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Precomputed price statistics kept in the ``price_stats`` table.
+
+Rows are keyed either by normalized article (``article_key`` set, tree
+columns empty) or by catalog leaf (``article_key`` empty, brand/model/
+generation/category set), so request handlers can read a single row.
+
+Recomputing a key reads all of its offers, so the ingest path does not do
+it per batch: :class:`~sonver.db.PartWriter` records the keys each batch
+touched in ``stale_stats`` (in the batch's transaction, so an interrupted
+ingest loses none) and :func:`refresh_stale_price_stats` recomputes them
+once when the writer is closed.
+
+Medians are weighted by duplicate cluster (see :mod:`sonver.dedup`): each
+offer counts ``1 / cluster_size``, so a part listed five times moves the
+median as much as one listed once. The dedup pass stores the sizes, so
+reading a weight is a column lookup rather than a window over the result.
+"""
+
+import sqlite3
+from datetime import datetime
+from itertools import groupby
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+SONVER_MARKUP = 1.35
+
+StatsKey = Tuple[str, str, str, str, str]
+CategoryKey = Tuple[str, str, str, str]
+# (price, weight) pairs as returned by the ``WEIGHT`` column below.
+Weighted = List[Tuple[float, float]]
+
+# Offer weight: one over the number of offers in its duplicate cluster, as
+# of the last dedup pass. Unclustered rows have cluster_size 1.
+WEIGHT = "1.0 / cluster_size"
+
+# Share of all stats rows above which refreshing stale keys rebuilds them all.
+REBUILD_FRACTION = 0.5
+
+
+def sonver_price(median_price: float) -> float:
+    return round(median_price * SONVER_MARKUP, 2)
+
+
+def article_stats_key(article_key: str) -> StatsKey:
+    return (article_key, "", "", "", "")
+
+
+def category_stats_key(brand: str, model: str, generation: str, category: str) -> StatsKey:
+    return ("", brand or "", model or "", generation or "", category or "")
+
+
+def weighted_median(prices: Weighted) -> float:
+    """Median of ``(price, weight)`` pairs; equals ``statistics.median`` for unit weights."""
+
+    pairs = sorted(prices)
+    half = sum(weight for _, weight in pairs) / 2
+    seen = 0.0
+    for i, (price, weight) in enumerate(pairs):
+        seen += weight
+        if seen > half + 1e-9:
+            return price
+        if seen >= half - 1e-9:
+            return (price + pairs[i + 1][0]) / 2
+    raise ValueError("weighted_median() of an empty sequence")
+
+
+def _store(cur: sqlite3.Cursor, key: StatsKey, prices: Weighted, now: str) -> None:
+    if not prices:
+        cur.execute(
+            """
+            DELETE FROM price_stats
+            WHERE article_key = ? AND brand = ? AND model = ? AND generation = ? AND category = ?
+            """,
+            key,
+        )
+        return
+    mid = weighted_median(prices)
+    values = [price for price, _ in prices]
+    cur.execute(
+        """
+        INSERT OR REPLACE INTO price_stats (
+            article_key, brand, model, generation, category,
+            count, min_price, max_price, median_price, sonver_price, updated_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        (*key, len(values), min(values), max(values), mid, sonver_price(mid), now),
+    )
+
+
+def refresh_price_stats(
+    conn: sqlite3.Connection,
+    article_keys: Iterable[str] = (),
+    categories: Iterable[CategoryKey] = (),
+) -> None:
+    """Recompute the stats rows for the given article keys and catalog leaves."""
+
+    cur = conn.cursor()
+    now = datetime.utcnow().isoformat()
+    for article_key in article_keys:
+        if not article_key:
+            continue
+        cur.execute(
+            f"SELECT price, {WEIGHT} FROM parts WHERE article_key = ? AND price > 0",
+            (article_key,),
+        )
+        _store(cur, article_stats_key(article_key), [tuple(r) for r in cur.fetchall()], now)
+    for brand, model, generation, category in categories:
+        cur.execute(
+            f"""
+            SELECT price, {WEIGHT} FROM parts
+            WHERE brand = ? AND model = ? AND generation = ? AND category = ? AND price > 0
+            """,
+            (brand, model, generation, category),
+        )
+        key = category_stats_key(brand, model, generation, category)
+        _store(cur, key, [tuple(r) for r in cur.fetchall()], now)
+
+
+def mark_stale(conn: sqlite3.Connection, keys: Iterable[StatsKey]) -> None:
+    """Queue stats keys for :func:`refresh_stale_price_stats`; the caller owns the transaction."""
+
+    conn.executemany(
+        """
+        INSERT OR IGNORE INTO stale_stats (article_key, brand, model, generation, category)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        keys,
+    )
+
+
+def refresh_stale_price_stats(conn: sqlite3.Connection) -> int:
+    """Recompute the stats rows queued by :func:`mark_stale`. Returns the number of keys.
+
+    When most keys are stale, one :func:`rebuild_price_stats` pass is
+    cheaper than a lookup per key. The caller owns the transaction.
+    """
+
+    stale = conn.execute("SELECT article_key, brand, model, generation, category FROM stale_stats").fetchall()
+    if not stale:
+        return 0
+    if len(stale) >= REBUILD_FRACTION * conn.execute("SELECT COUNT(*) FROM price_stats").fetchone()[0]:
+        rebuild_price_stats(conn)
+    else:
+        refresh_price_stats(
+            conn,
+            article_keys=[key[0] for key in stale if key[0]],
+            categories=[tuple(key[1:]) for key in stale if not key[0]],
+        )
+    conn.execute("DELETE FROM stale_stats")
+    return len(stale)
+
+
+def _grouped(cur: sqlite3.Cursor, width: int) -> Iterator[Tuple[Sequence[str], Weighted]]:
+    for key, rows in groupby(cur, key=lambda r: tuple(r[:width])):
+        yield key, [(r[width], r[width + 1]) for r in rows]
+
+
+def rebuild_price_stats(conn: sqlite3.Connection) -> None:
+    """Recompute every stats row in one ordered pass over ``parts``."""
+
+    read = conn.cursor()
+    write = conn.cursor()
+    now = datetime.utcnow().isoformat()
+    write.execute("DELETE FROM price_stats")
+    read.execute(
+        f"""
+        SELECT article_key, price, {WEIGHT} FROM parts
+        WHERE price > 0 AND article_key != ''
+        ORDER BY article_key
+        """
+    )
+    for (article_key,), prices in _grouped(read, 1):
+        _store(write, article_stats_key(article_key), prices, now)
+    read.execute(
+        f"""
+        SELECT brand, model, generation, category, price,
+               {WEIGHT}
+        FROM parts
+        WHERE price > 0
+        ORDER BY brand, model, generation, category
+        """
+    )
+    for leaf, prices in _grouped(read, 4):
+        _store(write, category_stats_key(*leaf), prices, now)
@@ -0,0 +1,113 @@
+"""Compact part record shared by the scrapers, normalization and the writer.
+
+A :class:`PartRecord` holds one listing in ``__slots__`` ordered like the
+``parts`` columns, so :meth:`PartRecord.as_row` is the parameter tuple of
+the upsert without any per-field lookups. It also supports the mapping
+access (``record["price"]``, ``record.get("url")``) code written against
+the former item dicts relies on.
+"""
+
+from operator import attrgetter
+from typing import Any, Dict, Mapping, Tuple
+
+PART_FIELDS = (
+    "platform",
+    "article",
+    "article_key",
+    "brand",
+    "model",
+    "generation",
+    "category",
+    "description",
+    "price",
+    "currency",
+    "location",
+    "url",
+    "image_url",
+    "last_seen",
+)
+
+_FIELD_SET = frozenset(PART_FIELDS)
+_as_row = attrgetter(*PART_FIELDS)
+
+
+class PartRecord:
+    __slots__ = PART_FIELDS
+
+    def __init__(
+        self,
+        platform: str = "unknown",
+        article: str = "",
+        article_key: str = "",
+        brand: str = "",
+        model: str = "",
+        generation: str = "",
+        category: str = "",
+        description: str = "",
+        price: Any = 0.0,
+        currency: str = "EUR",
+        location: str = "",
+        url: str = "",
+        image_url: str = "",
+        last_seen: str = "",
+    ) -> None:
+        self.platform = platform
+        self.article = article
+        self.article_key = article_key
+        self.brand = brand
+        self.model = model
+        self.generation = generation
+        self.category = category
+        self.description = description
+        self.price = price
+        self.currency = currency
+        self.location = location
+        self.url = url
+        self.image_url = image_url
+        self.last_seen = last_seen
+
+    @classmethod
+    def from_dict(cls, item: Mapping[str, Any]) -> "PartRecord":
+        """Build a record from an item dict, ignoring keys that are not part fields."""
+
+        record = cls()
+        for name, value in item.items():
+            if name in _FIELD_SET:
+                setattr(record, name, value)
+        return record
+
+    def as_row(self) -> Tuple[Any, ...]:
+        """Field values in ``PART_FIELDS`` order."""
+
+        return _as_row(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(zip(PART_FIELDS, _as_row(self)))
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return getattr(self, name, default) if name in _FIELD_SET else default
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in _FIELD_SET:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def __setitem__(self, name: str, value: Any) -> None:
+        if name not in _FIELD_SET:
+            raise KeyError(name)
+        setattr(self, name, value)
+
+    def __contains__(self, name: object) -> bool:
+        return name in _FIELD_SET
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, PartRecord):
+            return NotImplemented
+        return _as_row(self) == _as_row(other)
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # Pickle as a plain tuple, e.g. when batches cross process queues.
+        return PartRecord, _as_row(self)
+
+    def __repr__(self) -> str:
+        return f"PartRecord({self.platform!r}, {self.article!r}, url={self.url!r}, price={self.price!r})"
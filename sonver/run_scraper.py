@@ -1,35 +1,185 @@
+import argparse
 import logging
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional
 
-from .normalize import normalize_item
-from .db import init_db, upsert_part
-from .scrapers import AutopliusScraper, MLAutoScraper, MobileDeScraper, RRRScraper
+from . import metrics
+from .crawl_state import CrawlState
+from .normalize import normalize_batches
+from .db import PartWriter, init_db
+from .expiry import archive_unseen
+from .images import probe_new_images
+from .scrapers import AutopliusScraper, HostUnavailable, MLAutoScraper, MobileDeScraper, RRRScraper, ResponseCache
+from .snapshot import publish_snapshot
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def run_all_scrapers() -> None:
-    scrapers = [RRRScraper(), MLAutoScraper(), AutopliusScraper(), MobileDeScraper()]
-    inserted = 0
-    updated = 0
+def crawl_summary(platform: str, items: int, elapsed: float, failed_requests: int = 0) -> Dict[str, Any]:
+    """Per-platform crawl figures, including request metrics when enabled."""
 
-    for scraper in scrapers:
-        logger.info("Running scraper for %s", scraper.platform)
-        raw_items = scraper.fetch_all()
-        logger.info("%s returned %s items", scraper.platform, len(raw_items))
-        for raw in raw_items:
-            item = normalize_item(raw)
-            if upsert_part(item):
-                inserted += 1
+    summary: Dict[str, Any] = {
+        "platform": platform,
+        "items": items,
+        "seconds": round(elapsed, 1),
+        "items_per_s": round(items / elapsed, 1) if elapsed else None,
+        "failed_requests": failed_requests,
+    }
+    if metrics.REGISTRY.enabled:
+        requests_ok, request_s = metrics.SCRAPER_REQUEST_SECONDS.total(platform=platform, outcome="ok")
+        parsed, parse_s = metrics.SCRAPER_PARSE_SECONDS.total(platform=platform)
+        summary.update(
+            requests=int(requests_ok),
+            mean_request_ms=round(1000 * request_s / requests_ok, 1) if requests_ok else None,
+            retries=int(metrics.SCRAPER_RETRIES.total(platform=platform)),
+            rate_decreases=int(metrics.SCRAPER_THROTTLE_EVENTS.total(platform=platform, event="decrease")),
+            breaker_trips=int(metrics.SCRAPER_THROTTLE_EVENTS.total(platform=platform, event="breaker_open")),
+            bytes=int(metrics.SCRAPER_RESPONSE_BYTES.total(platform=platform)),
+            cache_hits=int(metrics.SCRAPER_CACHE_HITS.total(platform=platform)),
+            parse_s=round(parse_s, 2),
+        )
+    return summary
+
+
+def close_run(conn: sqlite3.Connection, state: CrawlState, failures: int, unrecorded: int, expire: bool) -> str:
+    """End a platform's crawl and return its run status.
+
+    A run with ``failures`` stays ``running`` to be resumed, unless this was
+    its final attempt; then it is finished as ``partial``. Unseen rows are
+    only archived when every failure was recorded against a leaf, whose
+    rows then count as seen.
+    """
+
+    if failures and not state.final_attempt:
+        logger.warning(
+            "%s: %s requests failed; run %s stays open to be resumed (attempt %s of %s)",
+            state.platform,
+            failures,
+            state.run_id,
+            state.attempts,
+            state.max_attempts,
+        )
+        return "running"
+    status = "partial" if failures else "complete"
+    state.finish(status)
+    if failures:
+        logger.warning(
+            "%s: finished run %s after %s attempts with %s failed requests",
+            state.platform,
+            state.run_id,
+            state.attempts,
+            failures,
+        )
+    if expire and unrecorded:
+        logger.warning("%s: skipping expiry, %s failed requests are not tied to a category", state.platform, unrecorded)
+    elif expire:
+        archive_unseen(conn, state.platform, state.run_id)
+    return status
+
+
+def run_all_scrapers(
+    batch_size: int = 500,
+    resume: bool = True,
+    incremental: bool = False,
+    cache: Optional[ResponseCache] = None,
+    expire: bool = True,
+    fetch_workers: int = 1,
+    max_per_host: Optional[int] = None,
+) -> None:
+    kwargs: Dict[str, Any] = {"cache": cache}
+    if max_per_host is not None:
+        kwargs["max_per_host"] = max_per_host
+    scrapers = [
+        RRRScraper(workers=fetch_workers, **kwargs),
+        MLAutoScraper(**kwargs),
+        AutopliusScraper(**kwargs),
+        MobileDeScraper(**kwargs),
+    ]
+
+    summaries = []
+    with PartWriter(batch_size=batch_size) as writer:
+        for scraper in scrapers:
+            logger.info("Running scraper for %s", scraper.platform)
+            state = CrawlState(writer.conn, scraper.platform, incremental=incremental)
+            state.begin(resume=resume)
+            scraper.state = state
+            writer.checkpoint = state
+            # Items are streamed into the writer, so at most one batch is
+            # held in memory regardless of catalog size.
+            started = time.perf_counter()
+            count = 0
+            try:
+                for batch in normalize_batches(scraper.iter_items(), batch_size):
+                    writer.add_batch(batch)
+                    count += len(batch)
+            except HostUnavailable as exc:
+                # Keep what was crawled; the run stays open and is resumed.
+                # The categories it did not reach are not recorded, so the
+                # abort counts as a failure that rules out expiry.
+                writer.flush()
+                logger.error("%s crawl stopped after %s items: %s", scraper.platform, count, exc)
+                close_run(writer.conn, state, scraper.failed_requests + 1, scraper.unrecorded_failures() + 1, expire)
+                status = "aborted: host unavailable"
             else:
-                updated += 1
+                writer.flush()
+                status = close_run(writer.conn, state, scraper.failed_requests, scraper.unrecorded_failures(), expire)
+            metrics.SCRAPER_ITEMS.inc(count, platform=scraper.platform)
+            summary = crawl_summary(scraper.platform, count, time.perf_counter() - started, scraper.failed_requests)
+            summary["status"] = status
+            summaries.append(summary)
+            logger.info("%s returned %s items (%s)", scraper.platform, count, status)
+
+    logger.info("Inserted %s items, updated %s items", writer.inserted, writer.updated)
+    for summary in summaries:
+        logger.info("Crawl summary: %s", summary)
 
-    logger.info("Inserted %s items, updated %s items", inserted, updated)
 
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Crawl all platforms into sonver.db")
+    parser.add_argument("--restart", action="store_true", help="ignore checkpoints of an interrupted crawl")
+    parser.add_argument(
+        "--incremental", action="store_true", help="shallow-scan categories whose first page is unchanged"
+    )
+    parser.add_argument(
+        "--keep-unseen", action="store_true", help="do not archive listings the crawl no longer returned"
+    )
+    parser.add_argument(
+        "--probe-images", action="store_true", help="probe new image URLs and refresh the best photos afterwards"
+    )
+    parser.add_argument(
+        "--no-snapshot", action="store_true", help="do not publish a read snapshot for search_api afterwards"
+    )
+    parser.add_argument(
+        "--fetch-workers", type=int, default=1, help="concurrent requests of the RRR crawl (default: sequential)"
+    )
+    parser.add_argument(
+        "--max-per-host", type=int, help="requests in flight per host (default: --fetch-workers)"
+    )
+    parser.add_argument("--cache-dir", help="cache HTTP responses in this directory")
+    parser.add_argument(
+        "--cache-mode",
+        choices=("readwrite", "record", "replay"),
+        default="readwrite",
+        help="replay serves a recorded crawl without touching the network",
+    )
+    args = parser.parse_args(argv)
 
-def main() -> None:
+    cache = ResponseCache(args.cache_dir, mode=args.cache_mode) if args.cache_dir else None
     init_db()
-    run_all_scrapers()
+    run_all_scrapers(
+        resume=not args.restart,
+        incremental=args.incremental,
+        cache=cache,
+        expire=not args.keep_unseen,
+        fetch_workers=args.fetch_workers,
+        max_per_host=args.max_per_host,
+    )
+    if args.probe_images:
+        probe_new_images()
+    if not args.no_snapshot:
+        publish_snapshot()
 
 
 if __name__ == "__main__":
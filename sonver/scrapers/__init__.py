@@ -1,4 +1,6 @@
-from .base import BaseScraper
+from .base import BaseScraper, HostUnavailable
+from .cache import ResponseCache
+from .throttle import Throttle
 from .rrr import RRRScraper
 from .mlauto import MLAutoScraper
 from .autoplius import AutopliusScraper
@@ -6,6 +8,9 @@ from .mobilede import MobileDeScraper
 
 __all__ = [
     "BaseScraper",
+    "HostUnavailable",
+    "ResponseCache",
+    "Throttle",
     "RRRScraper",
     "MLAutoScraper",
     "AutopliusScraper",
@@ -1,41 +1,204 @@
 import time
 import logging
-from typing import Any, Dict, List, Optional
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, TypeVar
+from urllib.parse import urlsplit
 
 import requests
 
+from .. import metrics
+from ..crawl_state import CrawlState
+from ..normalize import RawItem
+from .cache import ResponseCache
+from .throttle import RETRY_STATUSES, Throttle, parse_retry_after
 
 logger = logging.getLogger(__name__)
 
+# Statuses that mean the page does not exist rather than that fetching it failed.
+NOT_FOUND_STATUSES = frozenset({404, 410})
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class HostUnavailable(Exception):
+    """Raised by :meth:`BaseScraper.get` while a host's circuit breaker is open.
+
+    The crawl stops instead of treating the missing pages as empty, so its
+    run is not marked complete and unfinished leaves are resumed later.
+    """
+
+
+def ordered_map(executor: Executor, fn: Callable[[T], R], items: Iterable[T], window: int) -> Iterator[R]:
+    """Like ``executor.map`` but with at most ``window`` calls in flight.
+
+    Results are yielded in input order, so a concurrent crawl produces the
+    same sequence as a sequential one.
+    """
+
+    pending: Deque[Future] = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
 
 class BaseScraper:
     """Base class for platform scrapers.
 
-    Subclasses should implement :meth:`fetch_all` and use the helper
-    :meth:`get` to perform HTTP requests with retry/backoff.
+    Subclasses should implement :meth:`fetch_all` (or, preferably, the
+    streaming :meth:`iter_items`) and use the helper :meth:`get` to perform
+    HTTP requests with retry/backoff. Requests are paced per host by a
+    :class:`~sonver.scrapers.throttle.Throttle` (by default one whose
+    backoff starts at ``delay``). When
+    ``max_per_host`` is set, :meth:`get` allows at most that many requests
+    in flight to any single host, which bounds concurrent crawls. An
+    optional :class:`~sonver.scrapers.cache.ResponseCache` short-circuits
+    :meth:`get` for cached responses. Scrapers that support checkpoints
+    consult ``state`` when it is set.
+
+    Requests that :meth:`get` gives up on are counted in
+    ``failed_requests``; a crawl with failed requests is incomplete, so its
+    run must not be finished.
     """
 
     base_url: str = ""
     platform: str = ""
 
-    def __init__(self, session: Optional[requests.Session] = None, delay: float = 0.5):
+    def __init__(
+        self,
+        session: Optional[requests.Session] = None,
+        delay: float = 0.5,
+        max_per_host: int = 0,
+        cache: Optional[ResponseCache] = None,
+        throttle: Optional[Throttle] = None,
+    ):
         self.session = session or requests.Session()
+        self.cache = cache
         self.delay = delay
+        self.throttle = throttle or Throttle(self.platform, backoff=delay)
+        self.max_per_host = max_per_host
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._host_slots_lock = threading.Lock()
+        self.state: Optional[CrawlState] = None
+        self.failed_requests = 0
+        self._failures_lock = threading.Lock()
+        self._thread_failures = threading.local()
+
+    def _record_failure(self) -> None:
+        with self._failures_lock:
+            self.failed_requests += 1
+        self._thread_failures.count = self.failures_in_thread() + 1
+
+    def failures_in_thread(self) -> int:
+        """Failed requests made by the calling thread so far.
+
+        Comparing the count before and after fetching something tells
+        whether that fetch was complete, also on a worker thread.
+        """
+
+        return getattr(self._thread_failures, "count", 0)
+
+    def unrecorded_failures(self) -> int:
+        """Failed requests whose missing pages the checkpoint does not record.
+
+        Scrapers that record failed leaves in ``state`` override this;
+        while it is non-zero, expiring unseen rows is unsafe.
+        """
+
+        return self.failed_requests
+
+    def _host_slot(self, url: str) -> Optional[threading.BoundedSemaphore]:
+        if self.max_per_host <= 0:
+            return None
+        host = urlsplit(url).netloc
+        with self._host_slots_lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.max_per_host)
+        return slot
 
     def get(self, url: str, params: Optional[Dict[str, Any]] = None, retries: int = 3) -> Optional[requests.Response]:
-        """Perform a GET request with basic retry support."""
+        """Perform a GET request with basic retry support.
+
+        Returns None when the request failed, which is counted in
+        ``failed_requests`` unless the page was not found. Raises
+        :class:`HostUnavailable` when the host's circuit breaker is open.
+        """
+
+        if self.cache is not None:
+            cached = self.cache.lookup(url, params)
+            if cached is not None:
+                metrics.SCRAPER_CACHE_HITS.inc(platform=self.platform)
+                return cached
+            if self.cache.replay_only:
+                self._record_failure()
+                return None
 
+        host = self.throttle.host(url)
+        slot = self._host_slot(url)
         for attempt in range(1, retries + 1):
+            # Waiting for the reserved slot happens outside the host
+            # semaphore, so a backoff never holds a concurrency slot.
+            start_at = host.schedule()
+            if start_at is None:
+                self._record_failure()
+                raise HostUnavailable(f"GET {url} skipped: circuit breaker open for {host.host}")
+            wait = start_at - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            start = time.perf_counter()
+            retry_after = None
             try:
-                response = self.session.get(url, params=params, timeout=10)
-                response.raise_for_status()
-                return response
+                if slot is None:
+                    response = self.session.get(url, params=params, timeout=host.timeout)
+                else:
+                    with slot:
+                        response = self.session.get(url, params=params, timeout=host.timeout)
             except requests.RequestException as exc:  # pragma: no cover - network errors
-                logger.warning("GET %s failed on attempt %s/%s: %s", url, attempt, retries, exc)
-                time.sleep(self.delay * attempt)
+                error: Any = exc
+            else:
+                elapsed = time.perf_counter() - start
+                if response.ok:
+                    host.success(elapsed)
+                    metrics.SCRAPER_REQUEST_SECONDS.observe(elapsed, platform=self.platform, outcome="ok")
+                    metrics.SCRAPER_RESPONSE_BYTES.inc(len(response.content), platform=self.platform)
+                    if self.cache is not None:
+                        self.cache.store(url, params, response)
+                    return response
+                if response.status_code not in RETRY_STATUSES:
+                    # The host is healthy; retrying the same request will not help.
+                    host.success(elapsed)
+                    metrics.SCRAPER_REQUEST_SECONDS.observe(elapsed, platform=self.platform, outcome="error")
+                    logger.warning("GET %s failed: HTTP %s", url, response.status_code)
+                    if response.status_code not in NOT_FOUND_STATUSES:
+                        self._record_failure()
+                    return None
+                error = f"HTTP {response.status_code}"
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            metrics.SCRAPER_REQUEST_SECONDS.observe(
+                time.perf_counter() - start, platform=self.platform, outcome="error"
+            )
+            metrics.SCRAPER_RETRIES.inc(platform=self.platform)
+            logger.warning("GET %s failed on attempt %s/%s: %s", url, attempt, retries, error)
+            host.failure(retry_after)
+        self._record_failure()
         return None
 
-    def fetch_all(self) -> List[Dict[str, Any]]:
+    def iter_items(self) -> Iterator[RawItem]:
+        """Yield raw items (part records or dicts) as they are scraped.
+
+        The default implementation materializes :meth:`fetch_all`; scrapers
+        that can stream should override this instead.
+        """
+
+        yield from self.fetch_all()
+
+    def fetch_all(self) -> List[RawItem]:
         """Return all raw items found on the platform."""
 
         raise NotImplementedError
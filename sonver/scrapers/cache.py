@@ -0,0 +1,173 @@
+"""On-disk HTTP response cache used by :class:`~sonver.scrapers.base.BaseScraper`.
+
+Entries are content-addressed by URL plus sorted query params. How long an
+entry stays fresh depends on the endpoint class it matches (stable discovery
+endpoints live for days, search pages not at all), and the cache evicts the
+least recently used entries once it grows past ``max_bytes``.
+
+Modes:
+
+* ``readwrite`` - serve fresh entries, fetch and store misses.
+* ``record`` - always fetch, store every response for later replay.
+* ``replay`` - never touch the network; serve any stored entry regardless of
+  age and treat misses as failed requests.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Pattern, Sequence, Tuple, Union
+from urllib.parse import urlencode
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+MODES = ("readwrite", "record", "replay")
+
+DAY = 24 * 60 * 60
+
+# (URL pattern, TTL in seconds); the first match wins.
+DEFAULT_TTLS: Tuple[Tuple[str, float], ...] = (
+    # Search pages first: the HTML search URL also looks like a category page.
+    (r"/api/search\b|/auto-parts/search\b", 0),
+    (r"/api/(brands|models|generations|categories)\b", 7 * DAY),
+    (r"/en(/auto-parts/[^/?]+)?/?$", 7 * DAY),
+)
+
+_KEPT_HEADERS = ("Content-Type", "Retry-After", "ETag", "Last-Modified")
+
+
+def cache_key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+    query = urlencode(sorted((params or {}).items()), doseq=True)
+    return hashlib.sha256(f"{url}?{query}".encode()).hexdigest()
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        ttls: Sequence[Tuple[str, float]] = DEFAULT_TTLS,
+        default_ttl: float = 0,
+        max_bytes: int = 512 * 1024 * 1024,
+        mode: str = "readwrite",
+    ) -> None:
+        if mode not in MODES:
+            raise ValueError(f"Unknown cache mode: {mode}")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttls: Tuple[Tuple[Pattern[str], float], ...] = tuple((re.compile(p), ttl) for p, ttl in ttls)
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._size = sum(path.stat().st_size for path in self._entries())
+
+    @property
+    def replay_only(self) -> bool:
+        return self.mode == "replay"
+
+    def ttl_for(self, url: str) -> float:
+        for pattern, ttl in self.ttls:
+            if pattern.search(url):
+                return ttl
+        return self.default_ttl
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / key
+
+    def _entries(self) -> Iterator[Path]:
+        return (path for path in self.directory.glob("??/*") if not path.name.endswith(".tmp"))
+
+    def lookup(self, url: str, params: Optional[Dict[str, Any]] = None) -> Optional[requests.Response]:
+        """Return a stored response for ``url`` if one may be served in the current mode."""
+
+        if self.mode == "record":
+            return None
+        path = self._path(cache_key(url, params))
+        try:
+            with path.open("rb") as fh:
+                meta = json.loads(fh.readline())
+                body = fh.read()
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        if not self.replay_only and time.time() - meta["stored_at"] > self.ttl_for(url):
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        response = requests.Response()
+        response.status_code = meta["status"]
+        response.url = meta["url"]
+        response.encoding = meta.get("encoding")
+        response.headers = CaseInsensitiveDict(meta.get("headers") or {})
+        response._content = body
+        return response
+
+    def store(self, url: str, params: Optional[Dict[str, Any]], response: requests.Response) -> None:
+        if self.replay_only:
+            return
+        if self.mode == "readwrite" and self.ttl_for(url) <= 0:
+            return
+        meta = {
+            "url": response.url or url,
+            "status": response.status_code,
+            "encoding": response.encoding,
+            "headers": {k: response.headers[k] for k in _KEPT_HEADERS if k in response.headers},
+            "stored_at": time.time(),
+        }
+        path = self._path(cache_key(url, params))
+        path.parent.mkdir(exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        data = json.dumps(meta).encode() + b"\n" + response.content
+        try:
+            old_size = path.stat().st_size
+        except OSError:
+            old_size = 0
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self._size += len(data) - old_size
+            over = self._size > self.max_bytes
+        if over:
+            self.evict()
+
+    def evict(self) -> None:
+        """Drop least recently used entries until the cache is below 90% of ``max_bytes``."""
+
+        with self._lock:
+            entries = []
+            for path in self._entries():
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            entries.sort()
+            size = sum(e[1] for e in entries)
+            target = self.max_bytes * 0.9
+            removed = 0
+            for _, entry_size, path in entries:
+                if size <= target:
+                    break
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+                size -= entry_size
+                removed += 1
+            self._size = size
+        if removed:
+            logger.info("Evicted %s cached responses", removed)
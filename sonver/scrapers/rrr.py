@@ -1,21 +1,125 @@
 import json
 import logging
-from typing import Any, Dict, List, Optional
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+from requests.adapters import HTTPAdapter
 
-from .base import BaseScraper
+try:
+    import lxml  # noqa: F401
+
+    DEFAULT_PARSER = "lxml"
+except ImportError:  # pragma: no cover - optional dependency
+    DEFAULT_PARSER = "html.parser"
+
+from .. import metrics
+from ..crawl_state import leaf_key
+from ..record import PartRecord
+from .base import BaseScraper, ordered_map
 
 
 logger = logging.getLogger(__name__)
 
 
+Leaf = Tuple[Dict[str, str], Dict[str, str], Dict[str, str], Dict[str, str]]
+Page = Tuple[int, List[PartRecord]]
+
+# Result containers: "div.part, div.search-item, li.search-item".
+_CONTAINER_CLASSES = frozenset({"part", "search-item"})
+
+# Per-item fields as (name, tag names, classes); each mirrors a selector list
+# formerly passed to ``select_one`` and keeps its first match in document order.
+_ITEM_FIELDS: Tuple[Tuple[str, frozenset, frozenset], ...] = (
+    ("title", frozenset({"h3"}), frozenset({"title", "search-item__title"})),
+    ("price", frozenset(), frozenset({"price", "search-item__price", "item-price"})),
+    ("link", frozenset({"a"}), frozenset()),
+    ("image", frozenset({"img"}), frozenset()),
+    ("location", frozenset(), frozenset({"location", "search-item__location"})),
+)
+
+
+def _has_container_class(value: Any) -> bool:
+    # While parsing, ``class`` may still be the raw space-separated string.
+    if not value:
+        return False
+    classes = value.split() if isinstance(value, str) else value
+    return not _CONTAINER_CLASSES.isdisjoint(classes)
+
+
+def _is_container(tag: Tag) -> bool:
+    if tag.name == "div":
+        return _has_container_class(tag.get("class"))
+    return tag.name == "li" and "search-item" in (tag.get("class") or ())
+
+
+_CONTAINER_STRAINER = SoupStrainer(["div", "li"], class_=_has_container_class)
+
+
+def _item_fields(item: Tag) -> Dict[str, Tag]:
+    """Find the first descendant matching each of ``_ITEM_FIELDS`` in one walk."""
+
+    found: Dict[str, Tag] = {}
+    for el in item.descendants:
+        if not isinstance(el, Tag):
+            continue
+        classes = el.get("class") or ()
+        for name, tags, class_names in _ITEM_FIELDS:
+            if name not in found and (el.name in tags or not class_names.isdisjoint(classes)):
+                found[name] = el
+        if len(found) == len(_ITEM_FIELDS):
+            break
+    return found
+
+
 class RRRScraper(BaseScraper):
+    """Scraper for rrr.lt.
+
+    With ``workers > 1`` discovery and per-category pagination run on a
+    bounded thread pool; ``max_per_host`` (defaulting to ``workers``) caps
+    simultaneous requests to rrr.lt. Items come out in the same order as a
+    sequential crawl.
+
+    When ``state`` is set, finished pages and categories are checkpointed so
+    an interrupted crawl resumes where it stopped; in incremental mode a
+    category whose first page is unchanged since the last crawl is only
+    shallow-scanned.
+
+    ``shard=(index, count)`` restricts the crawl to the brands whose id
+    hashes to ``index`` modulo ``count``, so ``count`` scrapers (e.g. in
+    separate processes) cover the catalog exactly once between them.
+
+    ``parser`` selects the BeautifulSoup backend for HTML pages; lxml is
+    used when installed. ``"html.parser"`` reproduces the pure-Python tree
+    exactly, which only matters for malformed markup such as nested ``li``.
+    """
+
     base_url = "https://rrr.lt"
     platform = "RRR"
 
-    def __init__(self, *args: Any, **kwargs: Any) -> None:
+    def __init__(
+        self,
+        *args: Any,
+        workers: int = 1,
+        parser: str = DEFAULT_PARSER,
+        shard: Optional[Tuple[int, int]] = None,
+        **kwargs: Any,
+    ) -> None:
+        self.parser = parser
+        if shard is not None and not 0 <= shard[0] < shard[1]:
+            raise ValueError(f"invalid shard {shard}")
+        self.shard = shard
+        if workers > 1:
+            kwargs.setdefault("max_per_host", workers)
         super().__init__(*args, **kwargs)
+        self.workers = max(1, workers)
+        # Failed requests per leaf key; those leaves are not marked done.
+        self.failed_leaves: Dict[str, int] = {}
+        if self.workers > 1:
+            adapter = HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers)
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
         self.session.headers.update(
             {
                 "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36",
@@ -31,7 +135,8 @@ class RRRScraper(BaseScraper):
         if not response:
             return None
         try:
-            return response.json()
+            with metrics.SCRAPER_PARSE_SECONDS.time(platform=self.platform, format="json"):
+                return response.json()
         except json.JSONDecodeError:
             return None
 
@@ -52,7 +157,7 @@ class RRRScraper(BaseScraper):
         response = self.get(url)
         if not response:
             return []
-        soup = BeautifulSoup(response.text, "html.parser")
+        soup = BeautifulSoup(response.text, self.parser)
         brands: List[Dict[str, str]] = []
         for option in soup.select("select[id*=brand] option, select[name*=brand] option"):
             value = option.get("value")
@@ -74,7 +179,7 @@ class RRRScraper(BaseScraper):
         response = self.get(url)
         if not response:
             return []
-        soup = BeautifulSoup(response.text, "html.parser")
+        soup = BeautifulSoup(response.text, self.parser)
         models: List[Dict[str, str]] = []
         for option in soup.select("select[id*=model] option, select[name*=model] option"):
             value = option.get("value")
@@ -113,38 +218,47 @@ class RRRScraper(BaseScraper):
     # -----------------------
     def parse_parts_page(
         self, html: str, brand: str, model: str, generation: str, category: str
-    ) -> List[Dict[str, Any]]:
-        soup = BeautifulSoup(html, "html.parser")
-        parts: List[Dict[str, Any]] = []
-        for item in soup.select("div.part, div.search-item, li.search-item"):
+    ) -> List[PartRecord]:
+        with metrics.SCRAPER_PARSE_SECONDS.time(platform=self.platform, format="html"):
+            return self._parse_parts_page(html, brand, model, generation, category)
+
+    def _parse_parts_page(
+        self, html: str, brand: str, model: str, generation: str, category: str
+    ) -> List[PartRecord]:
+        # Only result containers are materialized, and each item's fields
+        # are collected in a single walk over its descendants.
+        soup = BeautifulSoup(html, self.parser, parse_only=_CONTAINER_STRAINER)
+        parts: List[PartRecord] = []
+        for item in soup.find_all(_is_container):
             article = item.get("data-article") or item.get("data-code") or ""
-            title_el = item.select_one(".title, .search-item__title, h3")
+            fields = _item_fields(item)
+            title_el = fields.get("title")
             description = title_el.get_text(strip=True) if title_el else ""
-            price_el = item.select_one(".price, .search-item__price, .item-price")
+            price_el = fields.get("price")
             price_text = price_el.get_text(strip=True) if price_el else ""
             price, currency = self._parse_price(price_text)
-            url_el = item.select_one("a")
+            url_el = fields.get("link")
             url = self.base_url + url_el.get("href", "") if url_el else ""
-            image_el = item.select_one("img")
+            image_el = fields.get("image")
             image_url = image_el.get("src") if image_el else ""
-            location_el = item.select_one(".location, .search-item__location")
+            location_el = fields.get("location")
             location = location_el.get_text(strip=True) if location_el else ""
 
             parts.append(
-                {
-                    "platform": self.platform,
-                    "article": article,
-                    "brand": brand,
-                    "model": model,
-                    "generation": generation,
-                    "category": category,
-                    "description": description,
-                    "price": price,
-                    "currency": currency,
-                    "location": location,
-                    "url": url,
-                    "image_url": image_url,
-                }
+                PartRecord(
+                    platform=self.platform,
+                    article=article,
+                    brand=brand,
+                    model=model,
+                    generation=generation,
+                    category=category,
+                    description=description,
+                    price=price,
+                    currency=currency,
+                    location=location,
+                    url=url,
+                    image_url=image_url,
+                )
             )
         return parts
 
@@ -165,27 +279,33 @@ class RRRScraper(BaseScraper):
 
     def parse_json_item(
         self, item: Dict[str, Any], brand: str, model: str, generation: str, category: str
-    ) -> Dict[str, Any]:
-        return {
-            "platform": self.platform,
-            "article": item.get("article") or item.get("code") or item.get("partNumber") or "",
-            "brand": brand,
-            "model": model,
-            "generation": generation,
-            "category": category,
-            "description": item.get("title") or item.get("description") or "",
-            "price": float(item.get("price") or 0),
-            "currency": item.get("currency") or item.get("currencyCode") or "EUR",
-            "location": item.get("location") or item.get("city") or "",
-            "url": item.get("url") or item.get("link") or "",
-            "image_url": item.get("image") or item.get("imageUrl") or "",
-        }
+    ) -> PartRecord:
+        return PartRecord(
+            platform=self.platform,
+            article=item.get("article") or item.get("code") or item.get("partNumber") or "",
+            brand=brand,
+            model=model,
+            generation=generation,
+            category=category,
+            description=item.get("title") or item.get("description") or "",
+            price=float(item.get("price") or 0),
+            currency=item.get("currency") or item.get("currencyCode") or "EUR",
+            location=item.get("location") or item.get("city") or "",
+            url=item.get("url") or item.get("link") or "",
+            image_url=item.get("image") or item.get("imageUrl") or "",
+        )
 
-    def fetch_parts(
-        self, brand: Dict[str, str], model: Dict[str, str], generation: Dict[str, str], category: Dict[str, str]
-    ) -> List[Dict[str, Any]]:
-        page = 1
-        results: List[Dict[str, Any]] = []
+    def iter_pages(
+        self,
+        brand: Dict[str, str],
+        model: Dict[str, str],
+        generation: Dict[str, str],
+        category: Dict[str, str],
+        start_page: int = 1,
+    ) -> Iterator[Page]:
+        """Yield ``(page, items)`` for one category, starting at ``start_page``."""
+
+        page = start_page
         while True:
             params = {
                 "page": page,
@@ -198,10 +318,10 @@ class RRRScraper(BaseScraper):
             data = self._fetch_json("/api/search", params=params)
             if isinstance(data, dict) and data.get("items"):
                 items = data.get("items") or []
-                for itm in items:
-                    results.append(
-                        self.parse_json_item(itm, brand["name"], model["name"], generation["name"], category["name"])
-                    )
+                yield page, [
+                    self.parse_json_item(itm, brand["name"], model["name"], generation["name"], category["name"])
+                    for itm in items
+                ]
                 if len(items) < params["size"]:
                     break
                 page += 1
@@ -215,22 +335,132 @@ class RRRScraper(BaseScraper):
             )
             if not page_items:
                 break
-            results.extend(page_items)
+            yield page, page_items
             page += 1
-        return results
 
-    def fetch_all(self) -> List[Dict[str, Any]]:
+    def iter_parts(
+        self, brand: Dict[str, str], model: Dict[str, str], generation: Dict[str, str], category: Dict[str, str]
+    ) -> Iterator[PartRecord]:
+        """Yield the parts of one category page by page."""
+
+        for _, items in self.iter_pages(brand, model, generation, category):
+            yield from items
+
+    def fetch_parts(
+        self, brand: Dict[str, str], model: Dict[str, str], generation: Dict[str, str], category: Dict[str, str]
+    ) -> List[PartRecord]:
+        return list(self.iter_parts(brand, model, generation, category))
+
+    # -----------------------
+    # Crawl drivers
+    # -----------------------
+    def _generations_or_default(self, brand: Dict[str, str], model: Dict[str, str]) -> List[Dict[str, str]]:
+        return self.fetch_generations(brand, model) or [{"id": "", "name": ""}]
+
+    def _categories_or_default(
+        self, brand: Dict[str, str], model: Dict[str, str], generation: Dict[str, str]
+    ) -> List[Dict[str, str]]:
+        return self.fetch_categories(brand, model, generation) or [{"id": "", "name": "All"}]
+
+    def in_shard(self, brand: Dict[str, str]) -> bool:
+        if self.shard is None:
+            return True
+        index, count = self.shard
+        return zlib.crc32(brand["id"].encode()) % count == index
+
+    def _shard_brands(self) -> List[Dict[str, str]]:
+        return [brand for brand in self.fetch_brands() if self.in_shard(brand)]
+
+    def _iter_leaves(self) -> Iterator[Leaf]:
+        for brand in self._shard_brands():
+            for model in self.fetch_models(brand):
+                for generation in self._generations_or_default(brand, model):
+                    for category in self._categories_or_default(brand, model, generation):
+                        yield brand, model, generation, category
+
+    def _iter_leaves_concurrent(self, pool: ThreadPoolExecutor) -> Iterator[Leaf]:
+        window = self.workers * 4
+        brands = self._shard_brands()
+        brand_models = ordered_map(pool, lambda b: (b, self.fetch_models(b)), brands, window)
+        pairs = ((b, m) for b, models in brand_models for m in models)
+        pair_generations = ordered_map(
+            pool, lambda bm: (bm, self._generations_or_default(*bm)), pairs, window
+        )
+        triples = ((b, m, g) for (b, m), gens in pair_generations for g in gens)
+        triple_categories = ordered_map(
+            pool, lambda bmg: (bmg, self._categories_or_default(*bmg)), triples, window
+        )
+        for (brand, model, generation), categories in triple_categories:
+            for category in categories:
+                yield brand, model, generation, category
+
+    def _leaf_pages(self, leaf: Leaf) -> Iterator[Page]:
+        """Yield the pages of ``leaf`` still needed according to ``state``.
+
+        Only reads the checkpoint, so it is safe to run on worker threads.
+        Requests that failed meanwhile are counted in ``failed_leaves``.
+        """
+
+        before = self.failures_in_thread()
+        yield from self._pending_pages(leaf)
+        failures = self.failures_in_thread() - before
+        if failures:
+            self.failed_leaves[leaf_key(*(node["id"] for node in leaf))] = failures
+
+    def _pending_pages(self, leaf: Leaf) -> Iterator[Page]:
+        if self.state is None:
+            yield from self.iter_pages(*leaf)
+            return
+        key = leaf_key(*(node["id"] for node in leaf))
+        if self.state.is_done(key):
+            return
+        for page, items in self.iter_pages(*leaf, start_page=self.state.next_page(key)):
+            yield page, items
+            if page == 1 and self.state.is_unchanged(key, items):
+                logger.debug("Skipping unchanged category %s", key)
+                return
+
+    def _checkpointed(self, leaf: Leaf, pages: Iterable[Page]) -> Iterator[PartRecord]:
+        """Yield items from ``pages``, recording progress once each page is consumed."""
+
+        if self.state is None:
+            for _, items in pages:
+                yield from items
+            return
+        key = leaf_key(*(node["id"] for node in leaf))
+        for page, items in pages:
+            yield from items
+            self.state.page_done(key, page, items)
+            if page == 1 and self.state.is_unchanged(key, items):
+                # Later pages were skipped; keep their stored rows alive.
+                self.state.leaf_unchanged(key, tuple(node["name"].strip() for node in leaf))
+        if key in self.failed_leaves:
+            # The next crawl resumes it at the page that failed.
+            logger.warning("Leaving category %s pending after %s failed requests", key, self.failed_leaves[key])
+            self.state.leaf_failed(key, tuple(node["name"].strip() for node in leaf))
+            return
+        self.state.leaf_done(key)
+
+    def unrecorded_failures(self) -> int:
+        return self.failed_requests - sum(self.failed_leaves.values())
+
+    def iter_items(self) -> Iterator[PartRecord]:
         logger.info("Fetching data from RRR.lt")
-        all_items: List[Dict[str, Any]] = []
-
-        brands = self.fetch_brands()
-        for brand in brands:
-            models = self.fetch_models(brand)
-            for model in models:
-                generations = self.fetch_generations(brand, model) or [{"id": "", "name": ""}]
-                for generation in generations:
-                    categories = self.fetch_categories(brand, model, generation) or [{"id": "", "name": "All"}]
-                    for category in categories:
-                        parts = self.fetch_parts(brand, model, generation, category)
-                        all_items.extend(parts)
-        return all_items
+
+        if self.workers == 1:
+            for leaf in self._iter_leaves():
+                yield from self._checkpointed(leaf, self._leaf_pages(leaf))
+            return
+
+        # Discovery and leaf pagination share one pool; leaves are
+        # scheduled as soon as their categories are known, and at most
+        # ``2 * workers`` finished categories are buffered at a time.
+        # Checkpoints are only updated here, on the consuming thread.
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="rrr") as pool:
+            leaves = self._iter_leaves_concurrent(pool)
+            fetched = ordered_map(pool, lambda leaf: (leaf, list(self._leaf_pages(leaf))), leaves, self.workers * 2)
+            for leaf, pages in fetched:
+                yield from self._checkpointed(leaf, pages)
+
+    def fetch_all(self) -> List[PartRecord]:
+        return list(self.iter_items())
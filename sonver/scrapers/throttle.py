@@ -0,0 +1,218 @@
+"""Adaptive per-host request scheduling for :meth:`BaseScraper.get`.
+
+Every host gets a request rate that grows additively while responses are
+quick and successful and is cut multiplicatively on errors, slow
+responses and ``429``/``503`` answers (AIMD). Requests are scheduled into
+time slots at that rate: a caller reserves the next free slot under a lock
+and waits for it outside the lock, so concurrent workers share one
+schedule per host and a backoff on one host never delays another.
+
+Failures push the host's next slot out by an exponential backoff, or by
+``Retry-After`` when the server sends one. After ``failure_threshold``
+consecutive failures the host's circuit breaker opens: requests fail fast
+for ``cooldown`` seconds, then a single probe request decides whether it
+closes again or stays open for twice as long.
+"""
+
+import logging
+import random
+import threading
+import time
+import weakref
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from .. import metrics
+
+logger = logging.getLogger(__name__)
+
+# Statuses that mean "try again later" rather than "this request is wrong".
+RETRY_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+_throttles: "weakref.WeakSet[Throttle]" = weakref.WeakSet()
+
+metrics.REGISTRY.gauge_callback(
+    "sonver_scraper_host_rate",
+    "Requests per second currently allowed per host",
+    lambda: {
+        (("host", host.host), ("platform", throttle.platform)): host.rate
+        for throttle in list(_throttles)
+        for host in throttle.hosts()
+    },
+)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait according to a ``Retry-After`` header (delta or HTTP date)."""
+
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class HostThrottle:
+    """Rate, backoff and circuit breaker state of one host."""
+
+    def __init__(self, throttle: "Throttle", host: str) -> None:
+        self.throttle = throttle
+        self.host = host
+        self.rate = throttle.initial_rate
+        self.latency: Optional[float] = None
+        self.failures = 0
+        self.cooldown = throttle.cooldown
+        self._next_at = 0.0
+        self._open_until = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def timeout(self) -> float:
+        """Request timeout: a multiple of the smoothed latency, within bounds."""
+
+        t = self.throttle
+        if self.latency is None:
+            return t.initial_timeout
+        return min(t.max_timeout, max(t.min_timeout, t.timeout_factor * self.latency))
+
+    def _event(self, event: str) -> None:
+        metrics.SCRAPER_THROTTLE_EVENTS.inc(platform=self.throttle.platform, host=self.host, event=event)
+
+    def schedule(self) -> Optional[float]:
+        """Reserve the next request slot; returns its ``time.monotonic()`` start.
+
+        Returns None while the circuit breaker is open, or while another
+        request is already probing a host whose breaker tripped.
+        """
+
+        with self._lock:
+            now = time.monotonic()
+            tripped = self.failures >= self.throttle.failure_threshold
+            if now < self._open_until or (tripped and self._probing):
+                self._event("rejected")
+                return None
+            if tripped:
+                self._probing = True
+            start = max(now, self._next_at)
+            self._next_at = start + 1.0 / self.rate
+            return start
+
+    def success(self, latency: float) -> None:
+        """Record a response from the host; slow responses still reduce the rate."""
+
+        t = self.throttle
+        with self._lock:
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            if self.failures >= t.failure_threshold:
+                logger.info("%s: circuit breaker closed for %s", t.platform, self.host)
+                self._event("breaker_closed")
+            self.failures = 0
+            self.cooldown = t.cooldown
+            self._probing = False
+            if latency > t.slow_latency:
+                self._decrease(f"slow response ({latency:.1f}s)")
+            else:
+                self.rate = min(t.max_rate, self.rate + t.increase)
+
+    def failure(self, retry_after: Optional[float] = None) -> None:
+        """Record a failed attempt and push the next slot out by the backoff."""
+
+        t = self.throttle
+        with self._lock:
+            now = time.monotonic()
+            self.failures += 1
+            self._probing = False
+            self._decrease("failure" if retry_after is None else f"Retry-After {retry_after:.0f}s")
+            if retry_after is not None:
+                delay = min(retry_after, t.max_backoff)
+                self._event("retry_after")
+            else:
+                delay = min(t.backoff * 2 ** (self.failures - 1), t.max_backoff) * random.uniform(0.5, 1.5)
+            self._next_at = max(self._next_at, now + delay)
+            if self.failures >= t.failure_threshold:
+                self._open_until = max(self._open_until, now + self.cooldown)
+                logger.warning(
+                    "%s: circuit breaker open for %s after %s failures; retrying in %.0fs",
+                    t.platform,
+                    self.host,
+                    self.failures,
+                    self.cooldown,
+                )
+                self._event("breaker_open")
+                self.cooldown = min(self.cooldown * 2, t.max_cooldown)
+
+    def _decrease(self, reason: str) -> None:
+        t = self.throttle
+        rate = max(t.min_rate, self.rate * t.decrease)
+        if rate < self.rate:
+            logger.info("%s: %s for %s, rate %.2f -> %.2f req/s", t.platform, reason, self.host, self.rate, rate)
+            self._event("decrease")
+        self.rate = rate
+
+
+class Throttle:
+    """Per-host :class:`HostThrottle` s sharing one configuration.
+
+    Safe to use from several threads; each host is scheduled independently.
+    """
+
+    def __init__(
+        self,
+        platform: str = "",
+        initial_rate: float = 4.0,
+        min_rate: float = 0.05,
+        max_rate: float = 25.0,
+        increase: float = 0.5,
+        decrease: float = 0.5,
+        slow_latency: float = 5.0,
+        backoff: float = 0.5,
+        max_backoff: float = 120.0,
+        failure_threshold: int = 5,
+        cooldown: float = 30.0,
+        max_cooldown: float = 600.0,
+        initial_timeout: float = 10.0,
+        min_timeout: float = 5.0,
+        max_timeout: float = 30.0,
+        timeout_factor: float = 4.0,
+    ) -> None:
+        self.platform = platform
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_latency = slow_latency
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.initial_timeout = initial_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_factor = timeout_factor
+        self._hosts: Dict[str, HostThrottle] = {}
+        self._lock = threading.Lock()
+        _throttles.add(self)
+
+    def host(self, url: str) -> HostThrottle:
+        name = urlsplit(url).netloc
+        with self._lock:
+            host = self._hosts.get(name)
+            if host is None:
+                host = self._hosts[name] = HostThrottle(self, name)
+        return host
+
+    def hosts(self) -> List[HostThrottle]:
+        with self._lock:
+            return list(self._hosts.values())
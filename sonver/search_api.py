@@ -1,102 +1,770 @@
-from statistics import median
-from typing import Any, Dict, List, Optional
+import asyncio
+import base64
+import csv
+import email.policy
+import io
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.parser import BytesParser
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, List, Literal, Optional, Sequence, Tuple, TypeVar
 
 import sqlite3
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
-from .db import get_connection, init_db
+from . import catalog, metrics, snapshot
+from .db import ConnectionPool, init_db
+from .meta import DATA_GENERATION, TREE_VERSION, get_meta
+from .normalize import normalize_article
+from .price_stats import WEIGHT, article_stats_key, sonver_price, weighted_median
+from .query_cache import QueryCache
+
+SearchMode = Literal["exact", "prefix", "substring"]
+ResponseFormat = Literal["json", "ndjson"]
+T = TypeVar("T")
+Offers = List[Dict[str, Any]]
+Cursor = Tuple[float, int]
+
+OFFER_FIELDS = (
+    "id",
+    "platform",
+    "article",
+    "article_key",
+    "brand",
+    "model",
+    "generation",
+    "category",
+    "description",
+    "price",
+    "currency",
+    "location",
+    "url",
+    "image_url",
+    "last_seen",
+    "cluster_id",
+)
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+# Rows per pool checkout while streaming NDJSON.
+STREAM_CHUNK = 500
+# bm25 column weights for parts_fts (description, brand, model, category):
+# a hit in a short field says more than one in a long description.
+TEXT_WEIGHTS = (1.0, 2.0, 2.0, 1.5)
+# Articles accepted by one /search/batch request, and offers per article.
+MAX_BATCH = 1000
+DEFAULT_BATCH_LIMIT = 10
+# Content types /search/batch reads as CSV; an empty one is read as CSV too.
+BATCH_TEXT_TYPES = frozenset({"text/csv", "text/plain", "application/csv", "application/vnd.ms-excel"})
+
+# Read pool sizing; one pool and one DB thread pool per worker process.
+POOL_SIZE = int(os.environ.get("SONVER_DB_POOL_SIZE", "8"))
+MMAP_SIZE = int(os.environ.get("SONVER_DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+CACHE_SIZE_KIB = int(os.environ.get("SONVER_DB_CACHE_KIB", str(64 * 1024)))
+QUERY_CACHE_SIZE = int(os.environ.get("SONVER_QUERY_CACHE_SIZE", "4096"))
+# Seconds between checks for a newly published snapshot.
+SNAPSHOT_CHECK_S = float(os.environ.get("SONVER_SNAPSHOT_CHECK_S", "1"))
 
 app = FastAPI(title="SONVER Search API")
 
+_pool: Optional[ConnectionPool] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+_snapshot_checked = 0.0
+query_cache = QueryCache(QUERY_CACHE_SIZE)
+
+metrics.REGISTRY.gauge_callback(
+    "sonver_api_query_cache",
+    "Query result cache hits, misses and entries",
+    lambda: {(("stat", name),): value for name, value in query_cache.stats().items()},
+)
+
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next: Callable[[Request], Any]) -> Any:
+    if not metrics.REGISTRY.enabled:
+        return await call_next(request)
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    metrics.API_REQUEST_SECONDS.observe(
+        time.perf_counter() - start,
+        route=getattr(route, "path", "unmatched"),
+        status=str(response.status_code),
+    )
+    return response
+
 
 @app.on_event("startup")
 def startup() -> None:
     init_db()
+    get_pool()
+
+
+@app.on_event("shutdown")
+def shutdown() -> None:
+    global _pool, _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+    if _pool is not None:
+        _pool.close()
+        _pool = None
+
+
+def get_pool() -> ConnectionPool:
+    """The pool serving the current snapshot, or the live database before any is published.
+
+    Every ``SNAPSHOT_CHECK_S`` the snapshot pointer is re-read; when it names
+    another file, new requests get a pool on that file and the old pool is
+    closed, its borrowed connections closing as they are returned.
+    """
+
+    global _pool, _executor, _snapshot_checked
+    now = time.monotonic()
+    if _pool is not None and now - _snapshot_checked < SNAPSHOT_CHECK_S:
+        return _pool
+    with _pool_lock:
+        if _pool is not None and now - _snapshot_checked < SNAPSHOT_CHECK_S:
+            return _pool
+        _snapshot_checked = now
+        path = snapshot.current_snapshot()
+        if _pool is None or _pool.path != path:
+            retired = _pool
+            _pool = ConnectionPool(
+                size=POOL_SIZE,
+                mmap_size=MMAP_SIZE,
+                cache_size_kib=CACHE_SIZE_KIB,
+                path=path,
+                immutable=path is not None,
+            )
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=_pool.size, thread_name_prefix="sonver-db")
+            if retired is not None:
+                retired.close()
+                query_cache.clear()
+    return _pool
+
+
+def _with_connection(fn: Callable[..., T], *args: Any) -> T:
+    with get_pool().connection() as conn:
+        if fn is cached:
+            # cached() times the wrapped query itself, and only on a miss.
+            return fn(conn, *args)
+        with metrics.API_SQL_SECONDS.time(query=fn.__name__):
+            return fn(conn, *args)
+
+
+def cached(
+    conn: sqlite3.Connection, key: Tuple[Any, ...], counter: str, fn: Callable[..., T], *args: Any
+) -> T:
+    """Return ``fn(conn, *args)`` from ``query_cache`` for the current value of ``counter``."""
+
+    cache_key = (*key, get_meta(conn, counter))
+    hit, value = query_cache.get(cache_key)
+    if hit:
+        return value
+    with metrics.API_SQL_SECONDS.time(query=fn.__name__):
+        value = fn(conn, *args)
+    query_cache.put(cache_key, value)
+    return value
+
+
+async def run_db(fn: Callable[..., T], *args: Any) -> T:
+    """Run ``fn(conn, *args)`` on the DB thread pool with a pooled connection."""
+
+    get_pool()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, partial(_with_connection, fn, *args))
 
 
 def row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
     return {key: row[key] for key in row.keys()}
 
 
-def compute_sonver_price(article: str) -> Optional[float]:
-    conn = get_connection()
+def article_filter(article: str, mode: str = "exact") -> Tuple[str, Tuple[Any, ...]]:
+    """Return a WHERE clause and params matching ``article`` on ``article_key``.
+
+    ``exact`` and ``prefix`` are answered from ``idx_article_key_price``;
+    ``substring`` is the explicit fallback and scans the whole table.
+    """
+
+    key = normalize_article(article)
+    if mode == "exact":
+        return "article_key = ?", (key,)
+    if mode == "prefix":
+        if not key:
+            return "article_key >= ?", (key,)
+        upper = key[:-1] + chr(ord(key[-1]) + 1)
+        return "article_key >= ? AND article_key < ?", (key, upper)
+    if mode == "substring":
+        return "instr(article_key, ?) > 0", (key,)
+    raise ValueError(f"Unknown search mode: {mode}")
+
+
+def compute_sonver_price(conn: sqlite3.Connection, article: str, mode: str = "exact") -> Optional[float]:
     cur = conn.cursor()
-    cur.execute("SELECT price FROM parts WHERE article LIKE ? AND price > 0", (f"%{article}%",))
-    prices = [r[0] for r in cur.fetchall() if r[0] is not None]
-    conn.close()
+    if mode == "exact":
+        cur.execute(
+            """
+            SELECT sonver_price FROM price_stats
+            WHERE article_key = ? AND brand = ? AND model = ? AND generation = ? AND category = ?
+            """,
+            article_stats_key(normalize_article(article)),
+        )
+        row = cur.fetchone()
+        return row[0] if row else None
+
+    # prefix/substring matches span several article keys; aggregate on demand.
+    clause, params = article_filter(article, mode)
+    cur.execute(f"SELECT price, {WEIGHT} FROM parts WHERE {clause} AND price > 0", params)
+    prices = [tuple(r) for r in cur.fetchall()]
     if not prices:
         return None
-    return round(median(prices) * 1.35, 2)
-
+    return sonver_price(weighted_median(prices))
 
-def fetch_offers_by_article(article: str) -> List[Dict[str, Any]]:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM parts WHERE article LIKE ? ORDER BY price ASC", (f"%{article}%",))
-    rows = cur.fetchall()
-    conn.close()
-    return [row_to_dict(row) for row in rows]
 
+def best_photo(conn: sqlite3.Connection, article: str, mode: str = "exact") -> Optional[Dict[str, Any]]:
+    """Largest probed photo of an exact article (see :mod:`sonver.images`)."""
 
-def build_tree() -> Dict[str, Dict[str, Dict[str, List[str]]]]:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT brand, model, generation, category FROM parts")
-    tree: Dict[str, Dict[str, Dict[str, List[str]]]] = {}
-    for brand, model, generation, category in cur.fetchall():
-        brand_node = tree.setdefault(brand or "Unknown", {})
-        model_node = brand_node.setdefault(model or "Unknown", {})
-        gen_key = generation or "Unknown"
-        categories = model_node.setdefault(gen_key, [])
-        cat_value = category or "Misc"
-        if cat_value not in categories:
-            categories.append(cat_value)
-    conn.close()
-    return tree
-
-
-def search_tree(brand: str, model: str, generation: str, category: str) -> List[Dict[str, Any]]:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
+    if mode != "exact":
+        return None
+    row = conn.execute(
         """
-        SELECT * FROM parts
-        WHERE brand = ? AND model = ? AND generation = ? AND category LIKE ?
-        ORDER BY price ASC
+        SELECT image_url, width, height FROM best_photo
+        WHERE article_key = ? AND brand = ? AND model = ? AND generation = ? AND category = ?
         """,
+        article_stats_key(normalize_article(article)),
+    ).fetchone()
+    return row_to_dict(row) if row else None
+
+
+def encode_cursor(price: float, row_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([price, row_id]).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    try:
+        price, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return float(price), int(row_id)
+    except (ValueError, TypeError) as exc:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from exc
+
+
+def parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    """Validate a comma-separated ``fields=`` projection against ``OFFER_FIELDS``."""
+
+    if not fields:
+        return OFFER_FIELDS
+    names = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [name for name in names if name not in OFFER_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return names or OFFER_FIELDS
+
+
+def fetch_offers(
+    conn: sqlite3.Connection,
+    clause: str,
+    params: Sequence[Any],
+    fields: Sequence[str] = OFFER_FIELDS,
+    after: Optional[Cursor] = None,
+    limit: Optional[int] = None,
+    collapse: bool = False,
+) -> Tuple[Offers, Optional[str]]:
+    """Return offers matching ``clause`` in (price, id) order after ``after``.
+
+    The second element is the cursor for the next page, or None when this
+    page is the last one. With ``collapse`` only the cheapest matching offer
+    of each duplicate cluster is returned.
+    """
+
+    columns = ", ".join(dict.fromkeys(("id", "price", *fields)))
+    params = tuple(params)
+    source = "parts"
+    if collapse:
+        source = f"""(
+            SELECT *, ROW_NUMBER() OVER (PARTITION BY COALESCE(cluster_id, id) ORDER BY price, id) AS cluster_rank
+            FROM parts WHERE {clause}
+        )"""
+        clause = "cluster_rank = 1"
+    if after is not None:
+        clause = f"({clause}) AND (price, id) > (?, ?)"
+        params += after
+    sql = f"SELECT {columns} FROM {source} WHERE {clause} ORDER BY price, id"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params += (limit + 1,)
+    rows = conn.execute(sql, params).fetchall()
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["price"], rows[-1]["id"])
+    return [{name: row[name] for name in fields} for row in rows], next_cursor
+
+
+def best_offer(
+    conn: sqlite3.Connection, clause: str, params: Sequence[Any], fields: Sequence[str] = OFFER_FIELDS
+) -> Optional[Dict[str, Any]]:
+    """Cheapest priced offer, falling back to any offer when none has a price."""
+
+    for extra in (" AND price > 0", ""):
+        offers, _ = fetch_offers(conn, f"({clause}){extra}", params, fields, limit=1)
+        if offers:
+            return offers[0]
+    return None
+
+
+def fetch_offers_by_article(
+    conn: sqlite3.Connection,
+    article: str,
+    mode: str = "exact",
+    fields: Sequence[str] = OFFER_FIELDS,
+    after: Optional[Cursor] = None,
+    limit: Optional[int] = None,
+) -> Tuple[Offers, Optional[str]]:
+    clause, params = article_filter(article, mode)
+    return fetch_offers(conn, clause, params, fields, after, limit)
+
+
+def tree_version(conn: sqlite3.Connection) -> int:
+    return get_meta(conn, TREE_VERSION)
+
+
+def build_tree(conn: sqlite3.Connection) -> catalog.Tree:
+    return catalog.load_tree(conn)
+
+
+async def _versioned(request: Request, response: Response, loader: Callable[..., Any], *args: str) -> Any:
+    """Answer with a tree-version ETag, or a bare 304 when the client is current.
+
+    Tree results are cached per tree version rather than data generation,
+    since most ingests add offers without adding leaves.
+    """
+
+    version = await run_db(tree_version)
+    etag = f'"tree-{version}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return await run_db(cached, (loader.__name__, *args), TREE_VERSION, loader, *args)
+
+
+def tree_filter(brand: str, model: str, generation: str, category: str) -> Tuple[str, Tuple[Any, ...]]:
+    return (
+        "brand = ? AND model = ? AND generation = ? AND category LIKE ?",
         (brand, model, generation, f"%{category}%"),
     )
-    rows = cur.fetchall()
-    conn.close()
-    return [row_to_dict(r) for r in rows]
 
 
-@app.get("/search")
-def search(article: str = Query(..., description="Part number to search")) -> Dict[str, Any]:
-    offers = fetch_offers_by_article(article)
-    recommended = compute_sonver_price(article)
-    best_offer = None
-    if offers:
-        best_offer = min(offers, key=lambda x: x.get("price") or float("inf"))
+def search_tree(
+    conn: sqlite3.Connection,
+    brand: str,
+    model: str,
+    generation: str,
+    category: str,
+    fields: Sequence[str] = OFFER_FIELDS,
+    after: Optional[Cursor] = None,
+    limit: Optional[int] = None,
+) -> Tuple[Offers, Optional[str]]:
+    clause, params = tree_filter(brand, model, generation, category)
+    return fetch_offers(conn, clause, params, fields, after, limit)
+
 
+def _search(
+    conn: sqlite3.Connection,
+    article: str,
+    mode: str,
+    fields: Sequence[str],
+    after: Optional[Cursor],
+    limit: int,
+    collapse: bool = False,
+) -> Dict[str, Any]:
+    clause, params = article_filter(article, mode)
+    offers, next_cursor = fetch_offers(conn, clause, params, fields, after, limit, collapse)
     return {
-        "recommended_price": recommended,
+        "recommended_price": compute_sonver_price(conn, article, mode),
         "offers": offers,
-        "best_offer": best_offer,
+        "best_offer": best_offer(conn, clause, params, fields),
+        "best_photo": best_photo(conn, article, mode),
+        "next_cursor": next_cursor,
     }
 
 
+def _paging(cursor: Optional[str], fields: Optional[str]) -> Tuple[Optional[Cursor], Tuple[str, ...]]:
+    try:
+        return (decode_cursor(cursor) if cursor else None), parse_fields(fields)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+def _stream_offers(
+    clause: str,
+    params: Tuple[Any, ...],
+    fields: Sequence[str],
+    after: Optional[Cursor],
+    limit: Optional[int],
+    collapse: bool = False,
+) -> StreamingResponse:
+    """Stream matching offers as NDJSON, checking out a connection per chunk."""
+
+    wanted = tuple(dict.fromkeys(("id", "price", *fields)))
+
+    async def lines() -> AsyncIterator[bytes]:
+        cursor, remaining = after, limit
+        while remaining is None or remaining > 0:
+            size = STREAM_CHUNK if remaining is None else min(STREAM_CHUNK, remaining)
+            rows, next_cursor = await run_db(fetch_offers, clause, params, wanted, cursor, size, collapse)
+            if rows:
+                yield "".join(
+                    json.dumps({name: row[name] for name in fields}) + "\n" for row in rows
+                ).encode()
+            if next_cursor is None:
+                break
+            cursor = (rows[-1]["price"], rows[-1]["id"])
+            if remaining is not None:
+                remaining -= len(rows)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.get("/search")
+async def search(
+    article: str = Query(..., description="Part number to search"),
+    mode: SearchMode = Query("exact", description="exact, prefix or (slow) substring match"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_LIMIT, description=f"page size, default {DEFAULT_LIMIT}"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="comma-separated offer fields to return"),
+    format: ResponseFormat = Query("json", description="ndjson streams offers one per line"),
+    collapse: bool = Query(False, description="return only the cheapest offer of each duplicate cluster"),
+) -> Any:
+    after, names = _paging(cursor, fields)
+    if format == "ndjson":
+        clause, params = article_filter(article, mode)
+        return _stream_offers(clause, params, names, after, limit, collapse)
+    limit = limit or DEFAULT_LIMIT
+    key = ("search", normalize_article(article), mode, names, after, limit, collapse)
+    return await run_db(cached, key, DATA_GENERATION, _search, article, mode, names, after, limit, collapse)
+
+
+class UnsupportedMediaType(ValueError):
+    """A ``/search/batch`` body in a content type it does not read."""
+
+
+def _uploaded_file(body: bytes, content_type: str) -> Tuple[bytes, str]:
+    """Content and content type of the file in a ``multipart/form-data`` body."""
+
+    message = BytesParser(policy=email.policy.HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + body
+    )
+    if not message.is_multipart():
+        raise ValueError("Malformed multipart body")
+    for part in message.iter_parts():
+        if part.get_filename() is not None or part.get_param("name", header="content-disposition") == "articles":
+            return part.get_payload(decode=True) or b"", part.get_content_type()
+    raise ValueError('Multipart upload has no file or "articles" field')
+
+
+def parse_batch_articles(body: bytes, content_type: str) -> List[str]:
+    """Articles from a JSON body (a list or ``{"articles": [...]}``), a CSV body or a file upload.
+
+    CSV uses the column headed ``article`` when there is one, otherwise the
+    first column of every row. A ``multipart/form-data`` upload is read
+    from its first file (or ``articles`` field) by that part's own content
+    type. Other content types raise :class:`UnsupportedMediaType`.
+    """
+
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type == "multipart/form-data":
+        return parse_batch_articles(*_uploaded_file(body, content_type))
+    if media_type == "application/json" or media_type.endswith("+json"):
+        data = json.loads(body or b"null")
+        if isinstance(data, dict):
+            data = data.get("articles")
+        if not isinstance(data, list):
+            raise ValueError('Expected a JSON list or {"articles": [...]}')
+        return [str(article) for article in data if article is not None]
+    if media_type and media_type not in BATCH_TEXT_TYPES:
+        raise UnsupportedMediaType(f"Unsupported content type {media_type}; send JSON, CSV or a file upload")
+
+    rows = [row for row in csv.reader(io.StringIO(body.decode("utf-8-sig"))) if row and any(row)]
+    if not rows:
+        return []
+    header = [cell.strip().lower() for cell in rows[0]]
+    if "article" in header:
+        column = header.index("article")
+        rows = rows[1:]
+    else:
+        column = 0
+    return [row[column] for row in rows if len(row) > column]
+
+
+def batch_search(
+    conn: sqlite3.Connection, keys: Sequence[str], fields: Sequence[str], limit: int
+) -> Dict[str, Dict[str, Any]]:
+    """Resolve many exact article keys in one pass over ``idx_article_key_price``.
+
+    Returns, per key that has offers, its ``limit`` cheapest offers, best
+    offer, recommended price and the cursor for continuing with ``/search``.
+    """
+
+    wanted = json.dumps(list(keys))
+    columns = ", ".join(dict.fromkeys(("id", "price", "article_key", *fields)))
+    rows = conn.execute(
+        f"""
+        SELECT * FROM (
+            SELECT {columns},
+                   ROW_NUMBER() OVER (PARTITION BY article_key ORDER BY price, id) AS rank,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY article_key ORDER BY CASE WHEN price > 0 THEN 0 ELSE 1 END, price, id
+                   ) AS best_rank,
+                   COUNT(*) OVER (PARTITION BY article_key) AS total
+            FROM parts
+            WHERE article_key IN (SELECT value FROM json_each(?))
+        )
+        WHERE rank <= ? OR best_rank = 1
+        ORDER BY article_key, rank
+        """,
+        (wanted, limit),
+    ).fetchall()
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        result = results.setdefault(
+            row["article_key"], {"recommended_price": None, "offers": [], "best_offer": None, "next_cursor": None}
+        )
+        offer = {name: row[name] for name in fields}
+        if row["rank"] <= limit:
+            result["offers"].append(offer)
+            if row["rank"] == limit and row["total"] > limit:
+                result["next_cursor"] = encode_cursor(row["price"], row["id"])
+        if row["best_rank"] == 1:
+            result["best_offer"] = offer
+
+    prices = conn.execute(
+        """
+        SELECT article_key, sonver_price FROM price_stats
+        WHERE article_key IN (SELECT value FROM json_each(?))
+          AND brand = '' AND model = '' AND generation = '' AND category = ''
+        """,
+        (wanted,),
+    )
+    for key, price in prices:
+        if key in results:
+            results[key]["recommended_price"] = price
+    return results
+
+
+def fts_query(text: str) -> str:
+    """Build an FTS5 MATCH expression requiring every word of ``text``.
+
+    Words are quoted so user input cannot inject FTS syntax; the last one
+    also matches as a prefix so partially typed queries still hit.
+    """
+
+    words = re.findall(r"\w+", text)
+    if not words:
+        return ""
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def text_search(
+    conn: sqlite3.Connection,
+    match: str,
+    platform: Optional[str],
+    brand: Optional[str],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    fields: Sequence[str] = OFFER_FIELDS,
+    after: Optional[Cursor] = None,
+    limit: int = DEFAULT_LIMIT,
+) -> Tuple[Offers, Optional[str]]:
+    """Offers matching ``match`` in BM25 order (best first), keyset-paged on (rank, id).
+
+    Without filters the page is ranked and limited inside the FTS query, so
+    only its rows are joined to ``parts``. Filters on ``parts`` columns
+    are applied in the join before ranking, which keeps selective filters
+    from scanning many ranked pages.
+    """
+
+    columns = ", ".join(f"p.{name}" for name in dict.fromkeys(("id", *fields)))
+    weights = ", ".join(str(weight) for weight in TEXT_WEIGHTS)
+    filters: List[str] = []
+    params: List[Any] = [match]
+    for clause, value in (
+        ("p.platform = ?", platform),
+        ("p.brand = ?", brand),
+        ("p.price >= ?", min_price),
+        ("p.price <= ?", max_price),
+    ):
+        if value is not None:
+            filters.append(clause)
+            params.append(value)
+    if filters:
+        sql = f"""
+            SELECT * FROM (
+                SELECT {columns}, bm25(parts_fts, {weights}) AS rank
+                FROM parts_fts JOIN parts AS p ON p.id = parts_fts.rowid
+                WHERE parts_fts MATCH ? AND {" AND ".join(filters)}
+            )
+        """
+        if after is not None:
+            sql += " WHERE (rank, id) > (?, ?)"
+            params.extend(after)
+        sql += " ORDER BY rank, id LIMIT ?"
+    else:
+        keyset = ""
+        if after is not None:
+            keyset = "WHERE (rank, id) > (?, ?)"
+            params.extend(after)
+        sql = f"""
+            SELECT {columns}, m.rank AS rank
+            FROM (
+                SELECT * FROM (
+                    SELECT rowid AS id, bm25(parts_fts, {weights}) AS rank FROM parts_fts
+                    WHERE parts_fts MATCH ?
+                )
+                {keyset}
+                ORDER BY rank, id LIMIT ?
+            ) AS m
+            JOIN parts AS p ON p.id = m.id
+            ORDER BY m.rank, m.id
+        """
+    params.append(limit + 1)
+    rows = conn.execute(sql, params).fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["rank"], rows[-1]["id"])
+    return [{name: row[name] for name in fields} for row in rows], next_cursor
+
+
+@app.get("/search/text")
+async def search_text(
+    q: str = Query(..., description="words to find in description, brand, model and category"),
+    platform: Optional[str] = Query(None),
+    brand: Optional[str] = Query(None),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_LIMIT, description=f"page size, default {DEFAULT_LIMIT}"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="comma-separated offer fields to return"),
+) -> Dict[str, Any]:
+    """Ranked full-text search over offers, best match first."""
+
+    after, names = _paging(cursor, fields)
+    match = fts_query(q)
+    if not match:
+        raise HTTPException(status_code=400, detail="Query has no searchable words")
+    limit = limit or DEFAULT_LIMIT
+    args = (match, platform, brand, min_price, max_price, names, after, limit)
+    try:
+        offers, next_cursor = await run_db(cached, ("text", *args), DATA_GENERATION, text_search, *args)
+    except sqlite3.OperationalError as exc:
+        if "parts_fts" not in str(exc):
+            raise
+        raise HTTPException(status_code=503, detail="Full-text index is not available") from exc
+    return {"offers": offers, "next_cursor": next_cursor}
+
+
+@app.post("/search/batch")
+async def search_batch(
+    request: Request,
+    limit: int = Query(DEFAULT_BATCH_LIMIT, ge=1, le=MAX_LIMIT, description="offers per article"),
+    fields: Optional[str] = Query(None, description="comma-separated offer fields to return"),
+) -> Dict[str, Any]:
+    """Exact lookup of a parts list sent as JSON, CSV/plain text or a multipart file upload."""
+
+    _, names = _paging(None, fields)
+    try:
+        articles = parse_batch_articles(await request.body(), request.headers.get("content-type", ""))
+    except UnsupportedMediaType as exc:
+        raise HTTPException(status_code=415, detail=str(exc)) from exc
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    articles = [article.strip() for article in articles if normalize_article(article)]
+    if len(articles) > MAX_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH} articles per batch")
+
+    keys = tuple(dict.fromkeys(normalize_article(article) for article in articles))
+    found = await run_db(cached, ("batch", keys, names, limit), DATA_GENERATION, batch_search, keys, names, limit)
+    empty = {"recommended_price": None, "offers": [], "best_offer": None, "next_cursor": None}
+    results = []
+    seen = set()
+    for article in articles:
+        article_key = normalize_article(article)
+        if article_key in seen:
+            continue
+        seen.add(article_key)
+        results.append({"article": article, **found.get(article_key, empty)})
+    return {"results": results}
+
+
 @app.get("/tree")
-def tree() -> Dict[str, Dict[str, Dict[str, List[str]]]]:
-    return build_tree()
+async def tree(request: Request, response: Response) -> Any:
+    return await _versioned(request, response, build_tree)
+
+
+@app.get("/tree/brands")
+async def tree_brands(request: Request, response: Response) -> Any:
+    return await _versioned(request, response, catalog.list_brands)
+
+
+@app.get("/tree/models")
+async def tree_models(request: Request, response: Response, brand: str = Query(...)) -> Any:
+    return await _versioned(request, response, catalog.list_models, brand)
+
+
+@app.get("/tree/generations")
+async def tree_generations(
+    request: Request, response: Response, brand: str = Query(...), model: str = Query(...)
+) -> Any:
+    return await _versioned(request, response, catalog.list_generations, brand, model)
+
+
+@app.get("/tree/categories")
+async def tree_categories(
+    request: Request,
+    response: Response,
+    brand: str = Query(...),
+    model: str = Query(...),
+    generation: str = Query(...),
+) -> Any:
+    return await _versioned(request, response, catalog.list_categories, brand, model, generation)
 
 
 @app.get("/tree/search")
-def tree_search(
+async def tree_search(
     brand: str = Query(...),
     model: str = Query(...),
     generation: str = Query(...),
     category: str = Query(""),
-) -> Dict[str, Any]:
-    offers = search_tree(brand, model, generation, category)
-    return {"offers": offers}
+    limit: Optional[int] = Query(None, ge=1, le=MAX_LIMIT, description=f"page size, default {DEFAULT_LIMIT}"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="comma-separated offer fields to return"),
+    format: ResponseFormat = Query("json", description="ndjson streams offers one per line"),
+) -> Any:
+    after, names = _paging(cursor, fields)
+    if format == "ndjson":
+        clause, params = tree_filter(brand, model, generation, category)
+        return _stream_offers(clause, params, names, after, limit)
+    args = (brand, model, generation, category, names, after, limit or DEFAULT_LIMIT)
+    offers, next_cursor = await run_db(cached, ("tree_search", *args), DATA_GENERATION, search_tree, *args)
+    return {"offers": offers, "next_cursor": next_cursor}
+
+
+@app.get("/cache/stats")
+async def cache_stats() -> Dict[str, int]:
+    return query_cache.stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint() -> PlainTextResponse:
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
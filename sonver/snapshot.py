@@ -0,0 +1,154 @@
+"""Immutable, compacted copies of sonver.db published for the API to serve.
+
+A crawl writes to the live ``sonver.db``; when it finishes it publishes a
+snapshot: ``VACUUM INTO`` copies the committed state into a new compacted
+file, which is then analyzed, has its full-text index merged, is switched
+to rollback journaling and is fsynced. The ``current`` pointer file in
+:data:`SNAPSHOT_DIR` names the snapshot to serve and is replaced
+atomically, so ``search_api`` workers pick up the new file on their next
+check without a restart. Snapshot files are never written again after
+publishing, which is what lets readers open them with ``immutable=1``.
+
+The newest ``keep`` snapshots stay on disk, so a bad publish can be undone
+with ``python -m sonver.snapshot rollback``. Writes made outside a crawl
+(imports, ``python -m sonver.dedup``) are served once the next snapshot is
+published, e.g. with ``python -m sonver.snapshot publish``.
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from . import db
+from .meta import DATA_GENERATION, get_meta
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_KEEP = 3
+_POINTER = "current"
+_PREFIX = "sonver-"
+
+
+def snapshot_dir() -> Path:
+    return db.DB_FILE.parent / "snapshots"
+
+
+def list_snapshots() -> List[Path]:
+    """Published snapshots, oldest first."""
+
+    directory = snapshot_dir()
+    if not directory.is_dir():
+        return []
+    return sorted(directory.glob(f"{_PREFIX}*.db"))
+
+
+def current_snapshot() -> Optional[Path]:
+    """The snapshot the API should serve, or None when none was published."""
+
+    try:
+        name = (snapshot_dir() / _POINTER).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+    path = snapshot_dir() / name
+    return path if name and path.exists() else None
+
+
+def _fsync(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _point_to(path: Path) -> None:
+    pointer = snapshot_dir() / _POINTER
+    tmp = pointer.with_suffix(".tmp")
+    tmp.write_text(path.name, encoding="utf-8")
+    _fsync(tmp)
+    os.replace(tmp, pointer)
+
+
+def _prune(keep: int) -> None:
+    current = current_snapshot()
+    for path in list_snapshots()[:-max(1, keep)]:
+        if path == current:
+            continue
+        try:
+            path.unlink()
+        except OSError as exc:  # still open by a reader on Windows
+            logger.warning("Could not remove old snapshot %s: %s", path.name, exc)
+
+
+def publish_snapshot(keep: int = DEFAULT_KEEP) -> Path:
+    """Copy the live database into a new snapshot and make it current."""
+
+    directory = snapshot_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp = directory / "publishing.tmp"
+    tmp.unlink(missing_ok=True)
+
+    conn = db.get_connection()
+    try:
+        generation = get_meta(conn, DATA_GENERATION)
+        conn.execute("VACUUM INTO ?", (str(tmp),))
+    finally:
+        conn.close()
+
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.execute("ANALYZE")
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'parts_fts'").fetchone():
+            conn.execute("INSERT INTO parts_fts (parts_fts) VALUES ('optimize')")
+        conn.commit()
+    finally:
+        conn.close()
+    _fsync(tmp)
+
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+    path = directory / f"{_PREFIX}{stamp}-g{generation}.db"
+    os.replace(tmp, path)
+    _point_to(path)
+    _prune(keep)
+    logger.info("Published snapshot %s", path.name)
+    return path
+
+
+def rollback_snapshot() -> Path:
+    """Point back to the snapshot published before the current one."""
+
+    snapshots = list_snapshots()
+    current = current_snapshot()
+    older = [path for path in snapshots if current is None or path < current]
+    if not older:
+        raise RuntimeError("No older snapshot to roll back to")
+    _point_to(older[-1])
+    logger.info("Rolled back to snapshot %s", older[-1].name)
+    return older[-1]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Publish and roll back read snapshots of sonver.db")
+    parser.add_argument("command", choices=("publish", "rollback", "list"))
+    parser.add_argument("--keep", type=int, default=DEFAULT_KEEP, help="snapshots kept on disk after publishing")
+    args = parser.parse_args(argv)
+
+    if args.command == "publish":
+        db.init_db()
+        publish_snapshot(keep=args.keep)
+    elif args.command == "rollback":
+        rollback_snapshot()
+    else:
+        current = current_snapshot()
+        for path in list_snapshots():
+            print(f"{'*' if path == current else ' '} {path.name}")
+
+
+if __name__ == "__main__":
+    main()
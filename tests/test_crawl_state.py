@@ -0,0 +1,52 @@
+import pytest
+
+from sonver import db
+from sonver.crawl_state import CrawlState
+from sonver.normalize import normalize_batch
+from sonver.run_scraper import close_run
+
+CATEGORY = ("BMW", "E90", "", "Lights")
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_FILE", tmp_path / "sonver.db")
+    db.init_db()
+    conn = db.get_write_connection()
+    yield conn
+    conn.close()
+
+
+def part(category, url):
+    return dict(platform="RRR", article="1K0-615", brand="BMW", model="E90", category=category, price=10, url=url)
+
+
+def test_failed_run_is_finished_as_partial_after_max_attempts(conn):
+    db.upsert_parts(normalize_batch([part("Lights", "u1"), part("Mirrors", "u2")]))
+
+    statuses = []
+    for _ in range(3):
+        state = CrawlState(conn, "RRR", max_attempts=3)
+        state.begin()
+        # Lights fails on every attempt; Mirrors is not returned any more.
+        state.leaf_failed("lights", CATEGORY)
+        with conn:
+            state.save(conn)
+        statuses.append(close_run(conn, state, failures=1, unrecorded=0, expire=True))
+
+    assert statuses == ["running", "running", "partial"]
+    assert state.attempts == 3
+    run = conn.execute("SELECT status, attempts FROM crawl_runs").fetchall()
+    assert [tuple(row) for row in run] == [("partial", 3)]
+    # The failed leaf's rows count as seen; only the unseen one is archived.
+    assert [row[0] for row in conn.execute("SELECT url FROM parts")] == ["u1"]
+    assert [row[0] for row in conn.execute("SELECT url FROM parts_archive")] == ["u2"]
+
+
+def test_unrecorded_failures_skip_expiry(conn):
+    db.upsert_parts(normalize_batch([part("Lights", "u1")]))
+    state = CrawlState(conn, "RRR", max_attempts=1)
+    state.begin()
+
+    assert close_run(conn, state, failures=1, unrecorded=1, expire=True) == "partial"
+    assert conn.execute("SELECT COUNT(*) FROM parts_archive").fetchone()[0] == 0
@@ -0,0 +1,73 @@
+import pytest
+
+from sonver import db
+from sonver.dedup import cluster_offers
+from sonver.normalize import normalize_batch
+
+DESCRIPTION = "Left headlight xenon with ballast"
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_FILE", tmp_path / "sonver.db")
+    db.init_db()
+    conn = db.get_write_connection()
+    yield conn
+    conn.close()
+
+
+def offers(conn, *items):
+    rows = [
+        dict(platform="RRR", brand="BMW", model="E90", category="Lights", url=f"u{i}", **item)
+        for i, item in enumerate(items)
+    ]
+    db.upsert_parts(normalize_batch(rows))
+    cluster_offers(conn)
+    return [row[0] for row in conn.execute("SELECT cluster_id FROM parts ORDER BY url")]
+
+
+def test_similar_offers_share_a_cluster(conn):
+    clusters = offers(
+        conn,
+        dict(article="1K0-615", description=DESCRIPTION, price=100),
+        dict(article="1K0 615", description=DESCRIPTION, price=110),
+    )
+    assert clusters[0] is not None and clusters[0] == clusters[1]
+
+
+def test_offers_without_description_or_image_are_not_clustered(conn):
+    clusters = offers(conn, dict(article="", price=10), dict(article="", price=10), dict(article="", price=10))
+    assert clusters == [None, None, None]
+
+
+def test_shared_article_key_alone_is_not_a_duplicate(conn):
+    clusters = offers(
+        conn,
+        dict(article="1K0-615", description="used hood", price=100),
+        dict(article="1K0-615", description="used wheel", price=100),
+    )
+    assert clusters == [None, None]
+
+
+def test_price_range_of_a_whole_cluster_is_bounded(conn):
+    # 90-120 and 120-140 are within the ratio, 90-140 is not.
+    clusters = offers(
+        conn,
+        dict(article="", description=DESCRIPTION, price=90),
+        dict(article="", description=DESCRIPTION, price=120),
+        dict(article="", description=DESCRIPTION, price=140),
+    )
+    assert clusters[0] == clusters[1] != clusters[2]
+
+
+def test_price_stats_weight_offers_by_cluster_size(conn):
+    offers(
+        conn,
+        dict(article="1K0-615", description=DESCRIPTION, price=100),
+        dict(article="1K0-615", description=DESCRIPTION, price=110),
+        dict(article="1K0-615", description="Right mirror", price=200),
+    )
+    sizes = [row[0] for row in conn.execute("SELECT cluster_size FROM parts ORDER BY url")]
+    assert sizes == [2, 2, 1]
+    median = conn.execute("SELECT median_price FROM price_stats WHERE article_key = '1k0615'").fetchone()[0]
+    assert median == 155.0
@@ -0,0 +1,50 @@
+import pytest
+
+from sonver import db
+from sonver.dedup import cluster_offers
+from sonver.expiry import archive_unseen
+from sonver.images import rebuild_best_photos, store_probes
+from sonver.normalize import normalize_batch
+
+DESCRIPTION = "Left headlight xenon with ballast"
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_FILE", tmp_path / "sonver.db")
+    db.init_db()
+    conn = db.get_write_connection()
+    yield conn
+    conn.close()
+
+
+def part(url, price, image_url):
+    return dict(
+        platform="RRR",
+        article="1K0-615",
+        brand="BMW",
+        model="E90",
+        category="Lights",
+        description=DESCRIPTION,
+        price=price,
+        url=url,
+        image_url=image_url,
+    )
+
+
+def test_archive_keeps_cluster_and_refreshes_best_photo(conn):
+    db.upsert_parts(normalize_batch([part("u1", 100, "big.jpg"), part("u2", 110, "small.jpg")]))
+    cluster_offers(conn)
+    store_probes(conn, [("big.jpg", "jpeg", 800, 600, "ok", ""), ("small.jpg", "jpeg", 80, 60, "ok", "")])
+    rebuild_best_photos(conn)
+    cluster = conn.execute("SELECT cluster_id FROM parts WHERE url = 'u1'").fetchone()[0]
+    assert cluster is not None
+
+    # Run 1 sees only u2, so u1 and its photo go.
+    with conn:
+        conn.execute("UPDATE parts SET crawl_generation = 1 WHERE url = 'u2'")
+    assert archive_unseen(conn, "RRR", 1) == 1
+
+    assert conn.execute("SELECT cluster_id FROM parts_archive WHERE url = 'u1'").fetchone()[0] == cluster
+    photos = {tuple(row) for row in conn.execute("SELECT article_key, category, image_url FROM best_photo")}
+    assert photos == {("1k0615", "", "small.jpg"), ("", "Lights", "small.jpg")}
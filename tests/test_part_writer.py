@@ -0,0 +1,47 @@
+import pytest
+
+from sonver import db
+from sonver.normalize import normalize_batch
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_FILE", tmp_path / "sonver.db")
+    db.init_db()
+    conn = db.get_connection()
+    yield conn
+    conn.close()
+
+
+def part(**fields):
+    item = dict(platform="RRR", article="1K0-615", brand="BMW", model="E90", category="Lights", price=10, url="u1")
+    item.update(fields)
+    return item
+
+
+def test_update_that_moves_a_row_refreshes_the_leaf_it_left(conn):
+    db.upsert_parts(normalize_batch([part(), part(category="Mirrors", url="u2", price=30)]))
+
+    db.upsert_parts(normalize_batch([part(category="Mirrors")]))
+
+    stats = {
+        row["category"]: (row["count"], row["median_price"])
+        for row in conn.execute("SELECT * FROM price_stats WHERE article_key = ''")
+    }
+    assert stats == {"Mirrors": (2, 20.0)}
+    leaves = [tuple(row) for row in conn.execute("SELECT * FROM catalog_tree")]
+    assert leaves == [("BMW", "E90", "Unknown", "Mirrors")]
+
+
+def test_stats_are_refreshed_once_when_the_writer_closes(conn):
+    writer = db.PartWriter(batch_size=1)
+    writer.extend(normalize_batch([part(), part(url="u2", price=30)]))
+
+    assert conn.execute("SELECT COUNT(*) FROM price_stats").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM stale_stats").fetchone()[0] == 2
+
+    writer.close()
+
+    median = conn.execute("SELECT median_price FROM price_stats WHERE article_key = '1k0615'").fetchone()[0]
+    assert median == 20.0
+    assert conn.execute("SELECT COUNT(*) FROM stale_stats").fetchone()[0] == 0
@@ -0,0 +1,16 @@
+from sonver.scrapers.cache import DAY, ResponseCache
+
+
+def test_search_pages_are_never_cached(tmp_path):
+    cache = ResponseCache(tmp_path)
+
+    assert cache.ttl_for("https://rrr.lt/en/auto-parts/search") == 0
+    assert cache.ttl_for("https://rrr.lt/en/auto-parts/search?q=1K0615301") == 0
+    assert cache.ttl_for("https://rrr.lt/api/search?page=2") == 0
+
+
+def test_discovery_pages_are_cached_for_a_week(tmp_path):
+    cache = ResponseCache(tmp_path)
+
+    assert cache.ttl_for("https://rrr.lt/api/brands") == 7 * DAY
+    assert cache.ttl_for("https://rrr.lt/en/auto-parts/brakes") == 7 * DAY
@@ -0,0 +1,109 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+import requests
+
+from sonver.scrapers import RRRScraper, Throttle
+
+BRANDS = [{"id": "1", "name": "BMW"}, {"id": "2", "name": "Audi"}, {"id": "3", "name": "Volvo"}]
+PAGE_SIZE = 50
+
+
+def leaf_items(query):
+    """Listings of one category; the BMW ones span two pages."""
+
+    count = 70 if query["brand"] == "1" else 3
+    prefix = "/".join(query[name] for name in ("brand", "model", "generation", "category"))
+    return [{"title": f"Part {i}", "price": i + 1, "url": f"/p/{prefix}/{i}"} for i in range(count)]
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """Serves the RRR JSON API and counts requests in flight."""
+
+    lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        try:
+            time.sleep(0.005)
+            url = urlsplit(self.path)
+            query = parse_qs(url.query, keep_blank_values=True)
+            self.respond(url.path, {name: values[0] for name, values in query.items()})
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+    def respond(self, path, query):
+        if path == "/api/brands":
+            body = BRANDS
+        elif path == "/api/models":
+            body = [{"id": f"{query['brand']}{m}", "name": f"Model {m}"} for m in "ab"]
+        elif path == "/api/generations":
+            # One model without generations exercises the default leaf.
+            body = [] if query["model"].endswith("b") else [{"id": "g1", "name": "Gen 1"}]
+        elif path == "/api/categories":
+            body = [{"id": "c1", "name": "Lights"}, {"id": "c2", "name": "Mirrors"}]
+        elif path == "/api/search":
+            page = int(query["page"])
+            body = {"items": leaf_items(query)[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]}
+        else:
+            self.send_error(404)
+            return
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stand_in():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    StandIn.max_in_flight = 0
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def crawl(base_url, workers, max_per_host=0):
+    session = requests.Session()
+    session.trust_env = False
+    scraper = RRRScraper(
+        session=session,
+        workers=workers,
+        max_per_host=max_per_host,
+        throttle=Throttle("RRR", initial_rate=1000, max_rate=1000),
+    )
+    scraper.base_url = base_url
+    items = [item.as_row() for item in scraper.iter_items()]
+    assert scraper.failed_requests == 0
+    return items
+
+
+def test_concurrent_crawl_matches_sequential(stand_in):
+    sequential = crawl(stand_in, workers=1)
+    assert StandIn.max_in_flight == 1
+    assert len(sequential) == 4 * 70 + 8 * 3
+
+    StandIn.max_in_flight = 0
+    assert crawl(stand_in, workers=6, max_per_host=2) == sequential
+    assert 1 < StandIn.max_in_flight <= 2
+
+    StandIn.max_in_flight = 0
+    assert crawl(stand_in, workers=4) == sequential
+    assert StandIn.max_in_flight <= 4
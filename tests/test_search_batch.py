@@ -0,0 +1,46 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from sonver import db, search_api
+from sonver.normalize import normalize_batch
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_FILE", tmp_path / "sonver.db")
+    monkeypatch.setattr(search_api, "_snapshot_checked", 0.0)
+    db.init_db()
+    db.upsert_parts(
+        normalize_batch(
+            [
+                dict(platform="RRR", article="1K0-615", brand="BMW", model="E90", price=10, url="u1"),
+                dict(platform="RRR", article="8E0 941", brand="Audi", model="A4", price=25, url="u2"),
+            ]
+        )
+    )
+    search_api.query_cache.clear()
+    with TestClient(search_api.app) as client:
+        yield client
+
+
+def articles(response):
+    assert response.status_code == 200, response.text
+    return [(result["article"], len(result["offers"])) for result in response.json()["results"]]
+
+
+def test_csv_file_upload(client):
+    upload = b"article,qty\n1K0615,1\n8E0-941,2\nmissing,1\n"
+    response = client.post("/search/batch", files={"file": ("parts.csv", upload, "text/csv")})
+    assert articles(response) == [("1K0615", 1), ("8E0-941", 1), ("missing", 0)]
+
+
+def test_json_body(client):
+    response = client.post("/search/batch", json={"articles": ["1k0 615"]})
+    assert articles(response) == [("1k0 615", 1)]
+
+
+def test_unsupported_content_type(client):
+    response = client.post(
+        "/search/batch", content=b"articles=1K0615", headers={"Content-Type": "application/x-www-form-urlencoded"}
+    )
+    assert response.status_code == 415